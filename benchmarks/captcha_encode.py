@@ -0,0 +1,40 @@
+"""Bytes per image and encode time for each captcha output format.
+
+Run from the repository root:  python benchmarks/captcha_encode.py [images]
+
+``png-base64`` is what the verify page used to inline before the binary
+/captcha route existed.
+"""
+import base64
+import sys
+import time
+
+from common import load
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    render = load("shield.captcha.render")
+    encode = load("shield.captcha.encode")
+
+    images = [render.render_image(render.make_challenge()[0]) for _ in range(count)]
+
+    rows = [("png-base64", "png", {})]
+    rows += [(fmt, fmt, {}) for fmt in encode.FORMATS]
+    rows += [(f"{fmt} effort={effort}", fmt, {"effort": effort}) for fmt in ("png", "webp") for effort in (1, 4)]
+
+    print(f"{'format':<20} {'bytes/image':>12} {'ms/image':>9}")
+    for label, fmt, options in rows:
+        total = 0
+        started = time.perf_counter()
+        for image in images:
+            data = encode.encode(image, fmt, **options)[0]
+            if label == "png-base64":
+                data = base64.b64encode(data)
+            total += len(data)
+        elapsed = time.perf_counter() - started
+        print(f"{label:<20} {total / count:12.0f} {elapsed / count * 1000:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
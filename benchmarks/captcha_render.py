@@ -0,0 +1,134 @@
+"""Per-image cost of the captcha renderer.
+
+Run from the repository root:  python benchmarks/captcha_render.py [iterations]
+
+``legacy`` is the renderer as it shipped before the glyph atlas and the numpy
+noise stage (font loaded, every character drawn with ``draw.text`` and every
+noise point and line drawn with ``ImageDraw`` per image); ``current`` is
+``shield.captcha.render.generate_captcha``. The last section compares the
+PIL path against the SVG challenge renderer.
+"""
+import base64
+import random
+import sys
+from io import BytesIO
+
+from common import bench, load
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+
+def legacy_generate_captcha():
+    import config
+
+    challenge = f"{random.randint(1, 20)} + {random.randint(1, 20)} = ?"
+    width, height = 220, 80
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype(config.CAPTCHA_FONT, 48)
+    except IOError:
+        font = ImageFont.load_default()
+    x_pos = 20
+    for char in challenge:
+        y_offset = random.randint(-5, 5)
+        draw.text((x_pos, 30 + y_offset), char, font=font, fill=(255, 255, 255, 230))
+        x_pos += random.randint(15, 25)
+    for _ in range(300):
+        x = random.randint(0, width - 1)
+        y = random.randint(0, height - 1)
+        draw.point((x, y), fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
+    for _ in range(8):
+        x1 = random.randint(0, width - 1)
+        y1 = random.randint(0, height - 1)
+        x2 = random.randint(0, width - 1)
+        y2 = random.randint(0, height - 1)
+        draw.line([(x1, y1), (x2, y2)], fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)), width=1)
+    image = image.filter(ImageFilter.GaussianBlur(radius=0.5))
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def legacy_text():
+    import config
+
+    image = Image.new('RGBA', (220, 80), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.truetype(config.CAPTCHA_FONT, 48)
+    except IOError:
+        font = ImageFont.load_default()
+    x_pos = 20
+    for char in "12 * 7 = ?":
+        draw.text((x_pos, 30), char, font=font, fill=(255, 255, 255, 230))
+        x_pos += 20
+
+
+def atlas_text(render):
+    def run():
+        image = Image.new('RGBA', (220, 80), (0, 0, 0, 0))
+        atlas = render.glyph_atlas()
+        x_pos = 20
+        for char in "12 * 7 = ?":
+            atlas.paste(image, char, x_pos, 30)
+            x_pos += 20
+    return run
+
+
+def legacy_noise():
+    width, height = 220, 80
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    for _ in range(300):
+        x = random.randint(0, width - 1)
+        y = random.randint(0, height - 1)
+        draw.point((x, y), fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
+    for _ in range(8):
+        x1 = random.randint(0, width - 1)
+        y1 = random.randint(0, height - 1)
+        x2 = random.randint(0, width - 1)
+        y2 = random.randint(0, height - 1)
+        draw.line([(x1, y1), (x2, y2)], fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)), width=1)
+    image.filter(ImageFilter.GaussianBlur(radius=0.5))
+
+
+def array_noise(render):
+    import numpy as np
+
+    def run():
+        pixels = np.zeros((80, 220, 4), dtype=np.uint8)
+        render.add_noise(pixels)
+        render.add_lines(pixels)
+        Image.fromarray(render.blur(pixels), 'RGBA')
+    return run
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    render = load("shield.captcha.render")
+
+    print("text stage")
+    before = bench("draw.text", legacy_text, iterations)
+    after = bench("atlas", atlas_text(render), iterations)
+    print(f"speedup      {before / after:8.2f}x\n")
+
+    print("noise, lines and blur")
+    before = bench("ImageDraw", legacy_noise, iterations)
+    after = bench("numpy", array_noise(render), iterations)
+    print(f"speedup      {before / after:8.2f}x\n")
+
+    print("full captcha")
+    before = bench("legacy", legacy_generate_captcha, iterations)
+    after = bench("current", render.generate_captcha, iterations)
+    print(f"speedup      {before / after:8.2f}x\n")
+
+    svg = load("shield.captcha.svg")
+    print("PIL raster vs SVG challenge")
+    raster = bench("PIL", render.generate_captcha, iterations)
+    vector = bench("svg", svg.generate_svg_captcha, iterations)
+    print(f"speedup      {raster / vector:8.2f}x")
+    print(f"bytes        {len(render.generate_captcha()['image']):8d} PIL, {len(svg.generate_svg_captcha()['image'])} svg")
+
+
+if __name__ == "__main__":
+    main()
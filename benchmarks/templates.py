@@ -0,0 +1,60 @@
+"""Per-request template render latency and allocations, before and after
+precompiling the site templates.
+
+Run from the repository root:  python benchmarks/templates.py [iterations]
+
+``per-request`` compiles the template source on every call, which is what
+``render_template_string`` does; ``compiled`` renders a Template built once.
+"""
+import ast
+import sys
+import tracemalloc
+
+from common import ROOT, bench
+from flask import Flask
+
+
+def load_templates():
+    with open(f"{ROOT}/shield/modules/site.py", encoding="utf8") as f:
+        tree = ast.parse(f.read())
+    templates = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant):
+            name = node.targets[0].id
+            if name.endswith("_TEMPLATE"):
+                templates[name] = node.value.value
+    return templates
+
+
+def allocated(func):
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    env = Flask(__name__).jinja_env
+    context = {
+        "LANDING_TEMPLATE": {},
+        "VERIFY_TEMPLATE": {"uid": "0" * 40, "captcha_src": "/captcha/token.png", "error": None},
+        "ERROR_TEMPLATE": {"error_message": "Link expired or invalid."},
+        "BANNED_TEMPLATE": {"error_message": "Your IP address has been banned."},
+    }
+
+    for name, source in load_templates().items():
+        compiled = env.from_string(source)
+        per_request = lambda: env.from_string(source).render(**context[name])
+        precompiled = lambda: compiled.render(**context[name])
+
+        print(f"{name} ({len(source) // 1024} KiB source)")
+        before = bench("per-request", per_request, iterations)
+        after = bench("compiled", precompiled, iterations)
+        print(f"{'speedup':<14} {before / after:8.1f}x")
+        print(f"{'peak alloc':<14} {allocated(per_request) // 1024:8d} KiB -> {allocated(precompiled) // 1024} KiB\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,4 +6,70 @@ BOT_TOKEN = str(getenv("BOT_TOKEN", ""))
 SUDOERS = list(map(int, getenv("SUDOERS", "").split()))
 MONGO_DB_URI = str(getenv("MONGO_DB_URI", ""))
 LOG_ID = str(getenv("LOG_ID", ""))
-START_IMG = str(getenv("START_IMG", ""))
\ No newline at end of file
+START_IMG = str(getenv("START_IMG", ""))
+METRICS_TOKEN = str(getenv("METRICS_TOKEN", ""))
+CAPTCHA_POOL_SIZE = int(getenv("CAPTCHA_POOL_SIZE", 64))
+CAPTCHA_PROCESSES = int(getenv("CAPTCHA_PROCESSES", 0))
+CAPTCHA_PROCESS_QUEUE = int(getenv("CAPTCHA_PROCESS_QUEUE", 32))
+CAPTCHA_PROCESS_TIMEOUT = float(getenv("CAPTCHA_PROCESS_TIMEOUT", 2.0))
+CAPTCHA_FONT = str(getenv("CAPTCHA_FONT", "arial.ttf"))
+CAPTCHA_STORE_SIZE = int(getenv("CAPTCHA_STORE_SIZE", 4096))
+CAPTCHA_TTL = int(getenv("CAPTCHA_TTL", 600))
+CAPTCHA_FORMAT = str(getenv("CAPTCHA_FORMAT", "png-palette"))
+CAPTCHA_ENCODE_EFFORT = int(getenv("CAPTCHA_ENCODE_EFFORT", 6))
+CAPTCHA_WEBP_QUALITY = int(getenv("CAPTCHA_WEBP_QUALITY", 60))
+CAPTCHA_PALETTE_COLORS = int(getenv("CAPTCHA_PALETTE_COLORS", 32))
+CAPTCHA_MODE = str(getenv("CAPTCHA_MODE", "image"))
+POW_DIFFICULTY = int(getenv("POW_DIFFICULTY", 16))
+POW_MAX_DIFFICULTY = int(getenv("POW_MAX_DIFFICULTY", 20))
+POW_RATE_STEP = float(getenv("POW_RATE_STEP", 5))
+CHALLENGE_MAX_RATE = float(getenv("CHALLENGE_MAX_RATE", 20))
+CHALLENGE_MAX_INFLIGHT = int(getenv("CHALLENGE_MAX_INFLIGHT", 32))
+CHALLENGE_LATENCY_BUDGET = float(getenv("CHALLENGE_LATENCY_BUDGET", 0.05))
+CHALLENGE_LATENCY_WINDOW = float(getenv("CHALLENGE_LATENCY_WINDOW", 30))
+STATIC_PAGE_MAX_AGE = int(getenv("STATIC_PAGE_MAX_AGE", 86400))
+FONT_DISPLAY = str(getenv("FONT_DISPLAY", "swap"))
+PROXY_HOPS = int(getenv("PROXY_HOPS", 1))
+COMPRESS_MIN_SIZE = int(getenv("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(getenv("COMPRESS_LEVEL", 6))
+COMPRESS_CACHE_SIZE = int(getenv("COMPRESS_CACHE_SIZE", 256))
+SHIELD_ROLE = str(getenv("SHIELD_ROLE", "bot"))
+WEB_MODE = str(getenv("WEB_MODE", "embedded"))
+SECRET_KEY = str(getenv("SECRET_KEY", ""))
+CAPTCHA_STORE = str(getenv("CAPTCHA_STORE", "memory"))
+WEB_PORT = int(getenv("PORT", 5689))
+WEB_WORKERS = int(getenv("WEB_WORKERS", 2))
+WEB_THREADS = int(getenv("WEB_THREADS", 8))
+WEB_KEEPALIVE = int(getenv("WEB_KEEPALIVE", 5))
+WEB_BACKLOG = int(getenv("WEB_BACKLOG", 2048))
+WEB_TIMEOUT = int(getenv("WEB_TIMEOUT", 30))
+WEB_GRACEFUL_TIMEOUT = int(getenv("WEB_GRACEFUL_TIMEOUT", 30))
+WEB_MAX_REQUESTS = int(getenv("WEB_MAX_REQUESTS", 0))
+BRIDGE_MAX_INFLIGHT = int(getenv("BRIDGE_MAX_INFLIGHT", 32))
+BRIDGE_TIMEOUT = float(getenv("BRIDGE_TIMEOUT", 10.0))
+RPC_SOCKET = str(getenv("RPC_SOCKET", ""))
+RPC_TIMEOUT = float(getenv("RPC_TIMEOUT", 10.0))
+INVITE_POOL = getenv("INVITE_POOL", "True").lower() in ("true", "1", "yes")
+INVITE_POOL_LINK_TTL = int(getenv("INVITE_POOL_LINK_TTL", 7200))
+INVITE_POOL_MIN_REMAINING = int(getenv("INVITE_POOL_MIN_REMAINING", 3600))
+INVITE_POOL_MIN = int(getenv("INVITE_POOL_MIN", 1))
+INVITE_POOL_MAX = int(getenv("INVITE_POOL_MAX", 10))
+INVITE_POOL_WINDOW = int(getenv("INVITE_POOL_WINDOW", 600))
+INVITE_POOL_INTERVAL = int(getenv("INVITE_POOL_INTERVAL", 30))
+NOTIFY_WORKERS = int(getenv("NOTIFY_WORKERS", 2))
+NOTIFY_MAX_ATTEMPTS = int(getenv("NOTIFY_MAX_ATTEMPTS", 8))
+NOTIFY_BACKOFF = float(getenv("NOTIFY_BACKOFF", 5.0))
+NOTIFY_DIGEST_WINDOW = int(getenv("NOTIFY_DIGEST_WINDOW", 300))
+NOTIFY_DIGEST_MAX_LINES = int(getenv("NOTIFY_DIGEST_MAX_LINES", 25))
+SEND_GLOBAL_RATE = float(getenv("SEND_GLOBAL_RATE", 30))
+SEND_GLOBAL_BURST = int(getenv("SEND_GLOBAL_BURST", 30))
+SEND_PRIVATE_RATE = float(getenv("SEND_PRIVATE_RATE", 1.0))
+SEND_PRIVATE_BURST = int(getenv("SEND_PRIVATE_BURST", 3))
+SEND_GROUP_RATE = float(getenv("SEND_GROUP_RATE", 0.33))
+SEND_GROUP_BURST = int(getenv("SEND_GROUP_BURST", 5))
+SEND_MAX_FLOOD_WAIT = int(getenv("SEND_MAX_FLOOD_WAIT", 300))
+SEND_SHED_BACKLOG = int(getenv("SEND_SHED_BACKLOG", 50))
+CHAT_CACHE_TTL = int(getenv("CHAT_CACHE_TTL", 3600))
+CHAT_CACHE_SIZE = int(getenv("CHAT_CACHE_SIZE", 5000))
+PROFILE_CACHE_TTL = int(getenv("PROFILE_CACHE_TTL", 3600))
+PROFILE_CACHE_SIZE = int(getenv("PROFILE_CACHE_SIZE", 1000))
@@ -0,0 +1,40 @@
+"""Gunicorn settings for running the verification site on its own.
+
+    gunicorn -c gunicorn.conf.py shield.modules.site:app
+
+Each worker imports ``shield`` in the web role: it logs in an in-memory,
+update-less client for the Telegram calls the site makes and never starts
+the embedded Flask server. Run the bot itself with WEB_MODE=external so it
+does not serve the site as well. Send SIGHUP to reload workers gracefully.
+
+Setting the same RPC_SOCKET for the bot and the workers splits the tiers
+fully: workers start no Telegram client and send their Telegram work to the
+bot process over that Unix socket.
+
+Workers must sign session cookies with the same key, or a /callback landing
+on another worker than its /verify fails. Set SECRET_KEY (rotating it logs
+everyone out of pending challenges); without it the key is derived from
+BOT_TOKEN, and a worker with neither refuses to start.
+"""
+import os
+
+os.environ.setdefault("SHIELD_ROLE", "web")
+# Workers do not share memory, so issued captcha images go through Mongo.
+os.environ.setdefault("CAPTCHA_STORE", "mongo")
+
+import config
+
+bind = f"0.0.0.0:{config.WEB_PORT}"
+worker_class = "gthread"
+workers = config.WEB_WORKERS
+threads = config.WEB_THREADS
+keepalive = config.WEB_KEEPALIVE
+backlog = config.WEB_BACKLOG
+timeout = config.WEB_TIMEOUT
+graceful_timeout = config.WEB_GRACEFUL_TIMEOUT
+max_requests = config.WEB_MAX_REQUESTS
+max_requests_jitter = config.WEB_MAX_REQUESTS // 10
+
+# The Telegram client and its event loop thread must be created in each
+# worker, not inherited across fork.
+preload_app = False
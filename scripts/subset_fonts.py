@@ -0,0 +1,66 @@
+"""Build the self-hosted WOFF2 font subsets used by the verification site.
+
+    pip install fonttools brotli
+    python scripts/subset_fonts.py path/to/Inter-Regular.woff2 --name inter-400
+
+Only the characters that appear in the site templates (plus printable ASCII,
+so error messages always render) are kept. The output goes to
+shield/web/static/fonts/, where the built subsets are committed and picked
+up at startup (see FONT_FACES in shield/web/fonts.py). Re-run it for each
+weight after changing template text.
+"""
+import argparse
+import ast
+import html
+import os
+import re
+
+from fontTools import subset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE = os.path.join(ROOT, "shield", "modules", "site.py")
+FONT_DIR = os.path.join(ROOT, "shield", "web", "static", "fonts")
+
+MARKUP = re.compile(r"<(style|script)>.*?</\1>|<[^>]+>|\{[{%].*?[%}]\}", re.S)
+
+
+def template_text():
+    tree = ast.parse(open(SITE, encoding="utf-8").read())
+    text = []
+    for node in tree.body:
+        if (isinstance(node, ast.Assign)
+                and isinstance(node.targets[0], ast.Name)
+                and node.targets[0].id.endswith("_TEMPLATE")):
+            text.append(html.unescape(MARKUP.sub(" ", node.value.value)))
+    return "".join(text)
+
+
+def build(source, output):
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.hinting = False
+    options.desubroutinize = True
+    options.name_IDs = [1, 2]
+    
+    font = subset.load_font(source, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=template_text() + "".join(map(chr, range(0x20, 0x7f))))
+    subsetter.subset(font)
+    subset.save_font(font, output, options)
+    return os.path.getsize(source), os.path.getsize(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="Inter font for one weight (.ttf or .woff2)")
+    parser.add_argument("--name", default="inter", help="output file stem")
+    args = parser.parse_args()
+    
+    os.makedirs(FONT_DIR, exist_ok=True)
+    output = os.path.join(FONT_DIR, f"{args.name}.woff2")
+    before, after = build(args.source, output)
+    print(f"{output}: {before / 1024:.1f} KiB -> {after / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,14 +15,52 @@ logging.basicConfig(
 logging.getLogger("pyrogram").setLevel(logging.ERROR)
 LOGGER = logging.getLogger(__name__)
 
-app = Client(
+if config.CAPTCHA_PROCESSES > 0:
+    # Forks the captcha render processes; this must happen before any other
+    # thread (Mongo monitors, Telegram client, loop thread) has started.
+    import shield.captcha
+
+from shield.sender import SendScheduler, is_write
+
+sender = SendScheduler(
+    global_rate=config.SEND_GLOBAL_RATE,
+    global_burst=config.SEND_GLOBAL_BURST,
+    private_rate=config.SEND_PRIVATE_RATE,
+    private_burst=config.SEND_PRIVATE_BURST,
+    group_rate=config.SEND_GROUP_RATE,
+    group_burst=config.SEND_GROUP_BURST,
+    max_flood_wait=config.SEND_MAX_FLOOD_WAIT,
+    shed_backlog=config.SEND_SHED_BACKLOG,
+)
+
+
+class ShieldClient(Client):
+    """Client whose writes (sends, edits, callback answers...) are paced by ``sender``."""
+
+    async def invoke(self, query, *args, **kwargs):
+        if is_write(query):
+            return await sender.invoke(super().invoke, query, *args, **kwargs)
+        return await super().invoke(query, *args, **kwargs)
+
+
+# The "web" role (gunicorn workers) only makes outgoing calls, so it skips
+# updates and keeps its session in memory instead of sharing the bot's file.
+WEB_ROLE = config.SHIELD_ROLE == "web"
+
+app = ShieldClient(
     "Sheild",
     api_id=API_ID,
     api_hash=API_HASH,
-    bot_token=BOT_TOKEN
+    bot_token=BOT_TOKEN,
+    no_updates=WEB_ROLE,
+    in_memory=WEB_ROLE
 )
 
 boot = time.time()
+web_task = None
+rpc_task = None
+invite_task = None
+notify_task = None
 async def austinOG():
     try:
         await app.start()
@@ -38,8 +76,55 @@ async def austinOG():
         print(e)
         exit()
 
+    if WEB_ROLE:
+        return
+
+    from shield.chats import chat_cache
+    try:
+        chat_cache.warm()
+    except Exception as e:
+        LOGGER.warning(f"Chat cache not warmed: {e}")
+
+    if config.INVITE_POOL:
+        global invite_task
+        from shield.invites import invite_pool
+        invite_task = asyncio.get_event_loop().create_task(invite_pool.run())
+
+    global notify_task
+    from shield.notify import notifications
+    notify_task = asyncio.get_event_loop().create_task(notifications.run())
+
+    if config.RPC_SOCKET:
+        # Web workers in other processes reach the bot through this socket.
+        global rpc_task
+        from shield.web.rpc import serve_rpc
+        rpc_task = asyncio.get_event_loop().create_task(serve_rpc(config.RPC_SOCKET))
+
+    if config.WEB_MODE == "external":
+        return
+
+    if config.WEB_MODE == "asgi":
+        # Served on this loop, so the site awaits Telegram and Mongo directly.
+        global web_task
+        from shield.web.asgi import serve_site
+        web_task = asyncio.get_event_loop().create_task(serve_site())
+        return
+
     from shield.modules.site import app as flask_app
     import threading
-    threading.Thread(target=lambda: flask_app.run(host="0.0.0.0", port=5689)).start()
+    threading.Thread(target=lambda: flask_app.run(host="0.0.0.0", port=config.WEB_PORT)).start()
+
+loop = asyncio.get_event_loop()
 
-asyncio.get_event_loop().run_until_complete(austinOG())
+if WEB_ROLE and config.RPC_SOCKET:
+    # Split deployment: the bot process owns the Telegram session and this
+    # web worker reaches it over RPC_SOCKET, so there is no client to start.
+    pass
+else:
+    loop.run_until_complete(austinOG())
+
+if WEB_ROLE and not config.RPC_SOCKET:
+    # No idle() in a web worker: keep the loop running in the background so
+    # Pyrogram's sync wrappers can hand calls from request threads to it.
+    import threading
+    threading.Thread(target=loop.run_forever, name="pyrogram-loop", daemon=True).start()
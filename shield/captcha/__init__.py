@@ -0,0 +1,69 @@
+import config
+
+from .render import generate_captcha, generate_lite_captcha
+from .executor import ProcessRenderer
+from .pool import CaptchaPool
+from .store import CaptchaStore, MongoCaptchaStore
+from .svg import generate_svg_captcha
+from .pow import generate_pow_challenge, verify_pow
+from .challenges import CHALLENGES, ChallengeSelector, register_challenge
+
+if config.CAPTCHA_PROCESSES > 0:
+    render_captcha = ProcessRenderer(
+        generate_captcha,
+        processes=config.CAPTCHA_PROCESSES,
+        queue_size=config.CAPTCHA_PROCESS_QUEUE,
+        timeout=config.CAPTCHA_PROCESS_TIMEOUT,
+    )
+    # Fork before this package opens Mongo below; shield/__init__ imports it
+    # ahead of anything else that starts a thread.
+    if config.SHIELD_ROLE == "web" or config.WEB_MODE != "external":
+        render_captcha.start()
+else:
+    render_captcha = generate_captcha
+
+captcha_pool = CaptchaPool(
+    render_captcha,
+    size=config.CAPTCHA_POOL_SIZE,
+    workers=max(1, config.CAPTCHA_PROCESSES),
+)
+
+if config.CAPTCHA_STORE == "mongo":
+    from shield.database import db
+    captcha_store = MongoCaptchaStore(db['captcha_images'], ttl=config.CAPTCHA_TTL)
+else:
+    captcha_store = CaptchaStore(size=config.CAPTCHA_STORE_SIZE, ttl=config.CAPTCHA_TTL)
+
+register_challenge("image", lambda cfg: captcha_pool.get(), cost=3)
+register_challenge("svg", lambda cfg: generate_svg_captcha(), cost=2)
+register_challenge("lite", lambda cfg: generate_lite_captcha(), cost=1)
+register_challenge("pow", generate_pow_challenge, cost=0, kind="pow", degradable=False)
+
+CAPTCHA_MODES = tuple(CHALLENGES)
+
+challenge_selector = ChallengeSelector(
+    max_rate=config.CHALLENGE_MAX_RATE,
+    max_inflight=config.CHALLENGE_MAX_INFLIGHT,
+    latency_budget=config.CHALLENGE_LATENCY_BUDGET,
+    latency_window=config.CHALLENGE_LATENCY_WINDOW,
+)
+
+__all__ = (
+    "CAPTCHA_MODES",
+    "CHALLENGES",
+    "ChallengeSelector",
+    "challenge_selector",
+    "generate_captcha",
+    "generate_lite_captcha",
+    "generate_pow_challenge",
+    "generate_svg_captcha",
+    "render_captcha",
+    "CaptchaPool",
+    "CaptchaStore",
+    "MongoCaptchaStore",
+    "ProcessRenderer",
+    "captcha_pool",
+    "captcha_store",
+    "register_challenge",
+    "verify_pow",
+)
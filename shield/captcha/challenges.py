@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from shield import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+CHALLENGES = OrderedDict()
+
+NORMAL, ELEVATED, SATURATED = 0, 1, 2
+LEVEL_NAMES = ("normal", "elevated", "saturated")
+
+
+class Challenge:
+    """A registered challenge type.
+
+    ``issue(cfg)`` returns a captcha dict (``kind == "image"``) or a
+    proof-of-work dict (``kind == "pow"``). ``cost`` ranks server CPU per
+    challenge; only ``degradable`` challenges are used as cheaper stand-ins.
+    """
+
+    def __init__(self, name, issue, cost, kind="image", degradable=True):
+        self.name = name
+        self._issue = issue
+        self.cost = cost
+        self.kind = kind
+        self.degradable = degradable
+
+    def issue(self, cfg):
+        started = time.perf_counter()
+        issued = self._issue(cfg)
+        elapsed = time.perf_counter() - started
+        metrics.observe("challenge.issue", elapsed)
+        metrics.observe(f"challenge.issue.{self.name}", elapsed)
+        return issued
+
+
+def register_challenge(name, issue, cost, kind="image", degradable=True):
+    CHALLENGES[name] = Challenge(name, issue, cost, kind=kind, degradable=degradable)
+    return CHALLENGES[name]
+
+
+class ChallengeSelector:
+    """Picks the challenge for each request from live load signals.
+
+    Pressure is the worst of the /verify request rate, in-flight web requests
+    and the p95 time to issue a challenge over the last ``latency_window``
+    seconds, each relative to its budget. Elevated
+    pressure steps the preferred challenge down one cost level; saturation
+    drops straight to the cheapest. Levels only relax once pressure falls
+    below ``recover`` times the threshold that raised them.
+    """
+
+    def __init__(self, max_rate, max_inflight, latency_budget, latency_window=30.0,
+                 elevated=0.7, recover=0.8):
+        self.max_rate = max_rate
+        self.max_inflight = max_inflight
+        self.latency_budget = latency_budget
+        self.latency_window = latency_window
+        self.thresholds = {ELEVATED: elevated, SATURATED: 1.0}
+        self.recover = recover
+        self.level = NORMAL
+        self._lock = threading.Lock()
+
+    def signals(self):
+        return {
+            "rate": metrics.rate("verify") / self.max_rate,
+            "inflight": metrics.gauges.get("web.inflight", 0) / self.max_inflight,
+            "latency": (metrics.percentile("challenge.issue", 95, self.latency_window) or 0) / self.latency_budget,
+        }
+
+    def update(self):
+        signals = self.signals()
+        pressure = max(signals.values())
+
+        with self._lock:
+            previous = self.level
+            if pressure >= self.thresholds[SATURATED]:
+                target = SATURATED
+            elif pressure >= self.thresholds[ELEVATED]:
+                target = ELEVATED
+            else:
+                target = NORMAL
+
+            if target > self.level:
+                self.level = target
+            while self.level > target and pressure < self.thresholds[self.level] * self.recover:
+                self.level -= 1
+            level = self.level
+
+        for name, value in signals.items():
+            metrics.gauge(f"challenge.signal.{name}", round(value, 3))
+        metrics.gauge("challenge.pressure", round(pressure, 3))
+        metrics.gauge("challenge.level", level)
+        if level != previous:
+            metrics.incr(f"challenge.level.{LEVEL_NAMES[level]}")
+            LOGGER.info(f"Challenge load level {LEVEL_NAMES[previous]} -> {LEVEL_NAMES[level]} (pressure {pressure:.2f})")
+        return level
+
+    def select(self, preferred):
+        chosen = CHALLENGES.get(preferred) or next(iter(CHALLENGES.values()))
+        level = self.update()
+
+        if level != NORMAL and chosen.degradable:
+            cheaper = sorted(
+                (c for c in CHALLENGES.values() if c.degradable and c.cost < chosen.cost),
+                key=lambda c: c.cost,
+                reverse=True,
+            )
+            if cheaper:
+                chosen = cheaper[-1] if level == SATURATED else cheaper[0]
+
+        metrics.incr(f"challenge.selected.{chosen.name}")
+        if chosen.name != preferred:
+            metrics.incr("challenge.degraded")
+        return chosen
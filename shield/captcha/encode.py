@@ -0,0 +1,46 @@
+from io import BytesIO
+from PIL import Image
+
+MIMETYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+FORMATS = ("png", "png-palette", "png-alpha", "webp-lossless", "webp")
+
+
+def encode(image, fmt="png", effort=6, quality=60, colors=32):
+    """Encode a rendered captcha; returns ``(data, mimetype, extension)``.
+
+    ``effort`` runs 0-9: it is the zlib level for PNG and is scaled onto the
+    WebP method (0-6) and, for lossless WebP, the compression quality.
+    ``quality`` only applies to lossy WebP and ``colors`` to palette PNG.
+    """
+    buffer = BytesIO()
+    effort = max(0, min(effort, 9))
+    method = effort * 6 // 9
+
+    if fmt == "png":
+        image.save(buffer, format="PNG", compress_level=effort)
+        extension = "png"
+    elif fmt == "png-palette":
+        palette = image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        palette.save(buffer, format="PNG", compress_level=effort)
+        extension = "png"
+    elif fmt == "png-alpha":
+        # Only for noise-free white-on-transparent images: keeps the alpha
+        # channel and drops colour, which skips quantization entirely.
+        white = Image.new("L", image.size, 255)
+        Image.merge("LA", (white, image.getchannel("A"))).save(buffer, format="PNG", compress_level=effort)
+        extension = "png"
+    elif fmt == "webp-lossless":
+        image.save(buffer, format="WEBP", lossless=True, quality=effort * 100 // 9, method=method)
+        extension = "webp"
+    elif fmt == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=method)
+        extension = "webp"
+    else:
+        raise ValueError(f"Unknown captcha format: {fmt}")
+
+    return buffer.getvalue(), MIMETYPES[extension], extension
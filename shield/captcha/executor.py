@@ -0,0 +1,86 @@
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from shield import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ProcessRenderer:
+    """Runs a captcha render function in worker processes instead of under our GIL.
+
+    At most ``queue_size`` renders may be submitted at once; a caller that cannot
+    get a slot, or whose render exceeds ``timeout``, gets an inline render instead.
+
+    Workers are forked once, by ``start``, which must run before the process
+    has any other threads: a child forked while another thread holds a lock
+    inherits that lock held. shield.captcha calls it at import, and
+    shield/__init__ imports that package before Mongo's monitor threads, the
+    Telegram client or the web role's loop thread exist. If the pool breaks it is not re-forked;
+    renders fall back to inline until the process is restarted.
+    """
+
+    def __init__(self, render, processes, queue_size=32, timeout=2.0):
+        self.render = render
+        self.processes = processes
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, queue_size))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._broken = False
+
+    def start(self):
+        with self._lock:
+            if self._executor is not None or self._broken:
+                return
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("fork"),
+            )
+            # A fork-context pool forks all of its workers on the first
+            # submit, so this is the only point at which we ever fork.
+            self._executor.submit(int).result()
+
+    def __call__(self):
+        executor = self._executor
+        if executor is None:
+            return self.render()
+
+        if not self._slots.acquire(timeout=self.timeout):
+            metrics.incr("captcha_procs.rejected")
+            return self.render()
+
+        started = time.perf_counter()
+        try:
+            future = executor.submit(self.render)
+            try:
+                result = future.result(timeout=self.timeout)
+            except TimeoutError:
+                future.cancel()
+                metrics.incr("captcha_procs.timeouts")
+                return self.render()
+            except BrokenProcessPool as e:
+                metrics.incr("captcha_procs.errors")
+                LOGGER.error(f"Captcha worker processes died, rendering inline from now on: {e}")
+                self._broken = True
+                self.shutdown()
+                return self.render()
+            except Exception as e:
+                metrics.incr("captcha_procs.errors")
+                LOGGER.error(f"Captcha worker process failed: {e}")
+                return self.render()
+        finally:
+            self._slots.release()
+
+        metrics.observe("captcha_procs.latency", time.perf_counter() - started)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from shield import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+
+class CaptchaPool:
+    """Bounded stock of pre-rendered captchas kept topped up by background threads.
+
+    The request path only pops an entry; when the pool is dry it falls back to
+    rendering inline so a verification never waits on the refill workers.
+    """
+
+    def __init__(self, render, size=64, workers=1, interval=1.0):
+        self.render = render
+        self.size = size
+        self.workers = max(1, workers)
+        self.interval = interval
+        self._entries = deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads = []
+        self._drained_at = None
+
+    def start(self):
+        if self._threads:
+            return
+        # Fork any render processes before our own threads exist.
+        start = getattr(self.render, "start", None)
+        if start is not None:
+            start()
+        if self.size <= 0:
+            return
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"captcha-pool-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def get(self):
+        with self._lock:
+            entry = self._entries.popleft() if self._entries else None
+            if self._drained_at is None:
+                self._drained_at = time.monotonic()
+            depth = len(self._entries)
+
+        metrics.gauge("captcha_pool.depth", depth)
+        self._wake.set()
+
+        if entry is not None:
+            metrics.incr("captcha_pool.hits")
+            return entry
+
+        metrics.incr("captcha_pool.misses")
+        return self._render()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _render(self):
+        started = time.perf_counter()
+        entry = self.render()
+        metrics.observe("captcha.render", time.perf_counter() - started)
+        return entry
+
+    def _reserve(self):
+        with self._lock:
+            if len(self._entries) + self._pending >= self.size:
+                return False
+            self._pending += 1
+            return True
+
+    def _fill(self):
+        while self._reserve():
+            try:
+                entry = self._render()
+            except Exception:
+                with self._lock:
+                    self._pending -= 1
+                raise
+
+            with self._lock:
+                self._pending -= 1
+                self._entries.append(entry)
+                depth = len(self._entries)
+                drained_at = None
+                if depth >= self.size:
+                    drained_at, self._drained_at = self._drained_at, None
+
+            metrics.incr("captcha_pool.rendered")
+            metrics.gauge("captcha_pool.depth", depth)
+            if drained_at is not None:
+                metrics.observe("captcha_pool.refill_lag", time.monotonic() - drained_at)
+
+    def _worker(self):
+        while True:
+            try:
+                self._fill()
+            except Exception as e:
+                metrics.incr("captcha_pool.errors")
+                LOGGER.error(f"Captcha pool refill failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,35 @@
+import hashlib
+import secrets
+
+import config
+from shield import metrics
+
+
+def leading_zero_bits(digest):
+    bits = 0
+    for byte in digest:
+        if byte:
+            return bits + 8 - byte.bit_length()
+        bits += 8
+    return bits
+
+
+def pow_difficulty(cfg=None):
+    """Required leading zero bits: the channel's base, raised while /verify is busy."""
+    base = (cfg or {}).get("pow_difficulty") or config.POW_DIFFICULTY
+    extra = int(metrics.rate("verify") // config.POW_RATE_STEP) if config.POW_RATE_STEP > 0 else 0
+    return min(base + extra, config.POW_MAX_DIFFICULTY)
+
+
+def generate_pow_challenge(cfg=None):
+    return {
+        'salt': secrets.token_hex(8),
+        'difficulty': pow_difficulty(cfg)
+    }
+
+
+def verify_pow(uid, salt, nonce, difficulty):
+    if not uid or not salt or not nonce or not nonce.isdigit() or len(nonce) > 16:
+        return False
+    digest = hashlib.sha256(f"{uid}:{salt}:{nonce}".encode()).digest()
+    return leading_zero_bits(digest) >= difficulty
@@ -0,0 +1,190 @@
+import os
+import random
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+import config
+from .encode import encode
+
+GLYPHS = "0123456789+-*=? "
+GLYPH_FILL = (255, 255, 255, 230)
+FONT_SIZE = 48
+
+WIDTH, HEIGHT = 220, 80
+LITE_SCALE = 2
+
+NOISE_POINTS = 300
+NOISE_LINES = 8
+# 3-tap [1, 6, 1] / 8 kernel applied along each axis; close to the old
+# GaussianBlur(radius=0.5) and cheap enough to run in integer arithmetic.
+BLUR_KERNEL = (1, 6)
+
+rng = np.random.default_rng()
+
+
+def _reseed():
+    global rng
+    rng = np.random.default_rng()
+
+
+# Captcha worker processes are forked; without this they would all share the
+# parent's generator state and draw identical noise.
+os.register_at_fork(after_in_child=_reseed)
+
+
+@lru_cache(maxsize=None)
+def load_font(path=None, size=FONT_SIZE):
+    try:
+        return ImageFont.truetype(path or config.CAPTCHA_FONT, size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+class GlyphAtlas:
+    """Captcha glyphs rasterized once, pasted into each image instead of drawn."""
+
+    def __init__(self, font, chars=GLYPHS, fill=GLYPH_FILL):
+        self.glyphs = {}
+        for char in chars:
+            left, top, right, bottom = font.getbbox(char)
+            if right <= left or bottom <= top:
+                self.glyphs[char] = None
+                continue
+            tile = Image.new('RGBA', (right - left, bottom - top), (0, 0, 0, 0))
+            ImageDraw.Draw(tile).text((-left, -top), char, font=font, fill=fill)
+            self.glyphs[char] = (tile, left, top)
+
+    def paste(self, image, char, x, y):
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            return
+        tile, left, top = glyph
+        image.alpha_composite(tile, (max(0, x + left), max(0, y + top)))
+
+
+@lru_cache(maxsize=None)
+def glyph_atlas(size=FONT_SIZE):
+    return GlyphAtlas(load_font(size=size))
+
+
+def make_challenge():
+    operations = ['+', '-', '*']
+    operation = random.choice(operations)
+    
+    if operation == '+':
+        num1 = random.randint(1, 20)
+        num2 = random.randint(1, 20)
+        answer = num1 + num2
+    elif operation == '-':
+        num1 = random.randint(10, 30)
+        num2 = random.randint(1, 9)
+        answer = num1 - num2
+    else:
+        num1 = random.randint(1, 10)
+        num2 = random.randint(1, 10)
+        answer = num1 * num2
+    
+    return f"{num1} {operation} {num2} = ?", str(answer)
+
+
+def add_noise(pixels, points=NOISE_POINTS):
+    height, width = pixels.shape[:2]
+    xs = rng.integers(0, width, points)
+    ys = rng.integers(0, height, points)
+    colors = rng.integers(100, 256, (points, 4), dtype=np.uint8)
+    colors[:, 3] = 255
+    pixels[ys, xs] = colors
+
+
+def add_lines(pixels, lines=NOISE_LINES):
+    height, width = pixels.shape[:2]
+    ends = rng.integers(0, (width, height, width, height), (lines, 4))
+    steps = np.linspace(0.0, 1.0, max(width, height))[:, None]
+    xs = np.rint(ends[:, 0] + (ends[:, 2] - ends[:, 0]) * steps).astype(np.intp)
+    ys = np.rint(ends[:, 1] + (ends[:, 3] - ends[:, 1]) * steps).astype(np.intp)
+    colors = rng.integers(100, 256, (lines, 4), dtype=np.uint8)
+    colors[:, 3] = 255
+    pixels[ys, xs] = colors
+
+
+def blur(pixels, kernel=BLUR_KERNEL):
+    side, centre = kernel
+    shift = (side * 2 + centre).bit_length() - 1
+    buf = pixels.astype(np.uint16)
+    for axis in (0, 1):
+        head = [slice(None)] * 3
+        tail = [slice(None)] * 3
+        head[axis], tail[axis] = slice(1, None), slice(None, -1)
+        out = buf * centre
+        out[tuple(head)] += buf[tuple(tail)] * side
+        out[tuple(tail)] += buf[tuple(head)] * side
+        buf = (out + (1 << (shift - 1))) >> shift
+    return buf.astype(np.uint8)
+
+
+def render_image(challenge, width=WIDTH, height=HEIGHT):
+    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    atlas = glyph_atlas()
+    
+    count = len(challenge)
+    xs = 20 + np.concatenate(([0], np.cumsum(rng.integers(15, 26, count - 1))))
+    ys = 30 + rng.integers(-5, 6, count)
+    for char, x_pos, y_pos in zip(challenge, xs.tolist(), ys.tolist()):
+        atlas.paste(image, char, x_pos, y_pos)
+    
+    pixels = np.array(image)
+    add_noise(pixels)
+    add_lines(pixels)
+    return Image.fromarray(blur(pixels), 'RGBA')
+
+
+def generate_captcha():
+    challenge, answer = make_challenge()
+    image = render_image(challenge)
+    
+    data, mimetype, extension = encode(
+        image,
+        config.CAPTCHA_FORMAT,
+        effort=config.CAPTCHA_ENCODE_EFFORT,
+        quality=config.CAPTCHA_WEBP_QUALITY,
+        colors=config.CAPTCHA_PALETTE_COLORS,
+    )
+    
+    return {
+        'challenge': challenge,
+        'answer': answer,
+        'image': data,
+        'mimetype': mimetype,
+        'extension': extension
+    }
+
+
+def generate_lite_captcha():
+    """Degraded captcha for when the web tier is saturated.
+
+    Half resolution, no noise, lines or blur, and an alpha-only PNG encode:
+    still a readable challenge for a fraction of the CPU.
+    """
+    challenge, answer = make_challenge()
+    scale = LITE_SCALE
+    image = Image.new('RGBA', (WIDTH // scale, HEIGHT // scale), (0, 0, 0, 0))
+    atlas = glyph_atlas(FONT_SIZE // scale)
+    
+    x_pos = 20 // scale
+    for char in challenge:
+        atlas.paste(image, char, x_pos, (30 + random.randint(-5, 5)) // scale)
+        x_pos += random.randint(15, 25) // scale
+    
+    data, mimetype, extension = encode(image, "png-alpha", effort=1)
+    
+    return {
+        'challenge': challenge,
+        'answer': answer,
+        'image': data,
+        'mimetype': mimetype,
+        'extension': extension
+    }
+
+
+glyph_atlas()
+glyph_atlas(FONT_SIZE // LITE_SCALE)
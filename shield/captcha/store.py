@@ -0,0 +1,74 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+class CaptchaStore:
+    """Issued captcha images kept by token until answered, replaced or expired.
+
+    Bounded by ``size``; the oldest images are dropped first once it is full.
+    """
+
+    def __init__(self, size=4096, ttl=600):
+        self.size = size
+        self.ttl = ttl
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, image, mimetype):
+        token = secrets.token_urlsafe(16)
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            self._images[token] = (image, mimetype, expires)
+            while len(self._images) > self.size:
+                self._images.popitem(last=False)
+        return token
+
+    def get(self, token):
+        with self._lock:
+            item = self._images.get(token)
+            if item is None:
+                return None
+            if item[2] < time.monotonic():
+                del self._images[token]
+                return None
+        return item[0], item[1]
+
+    def discard(self, token):
+        if token:
+            with self._lock:
+                self._images.pop(token, None)
+
+
+class MongoCaptchaStore:
+    """CaptchaStore kept in a Mongo collection so every web worker sees it.
+
+    Expired images are filtered on read and removed by a TTL index.
+    """
+
+    def __init__(self, collection, ttl=600):
+        self.ttl = ttl
+        self._images = collection
+        self._images.create_index("expires_at", expireAfterSeconds=0)
+
+    def put(self, image, mimetype):
+        token = secrets.token_urlsafe(16)
+        self._images.insert_one({
+            "_id": token,
+            "image": image,
+            "mimetype": mimetype,
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+        })
+        return token
+
+    def get(self, token):
+        item = self._images.find_one({"_id": token, "expires_at": {"$gt": datetime.utcnow()}})
+        if item is None:
+            return None
+        return item["image"], item["mimetype"]
+
+    def discard(self, token):
+        if token:
+            self._images.delete_one({"_id": token})
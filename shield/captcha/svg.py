@@ -0,0 +1,97 @@
+import random
+import re
+
+from .render import make_challenge
+
+# Stroke outlines for every character a challenge can contain, drawn on a
+# 20 x 32 cell. Rendered as paths, so no font or rasterizer is involved.
+GLYPH_PATHS = {
+    "0": "M10 2 C2 2 2 30 10 30 C18 30 18 2 10 2 Z",
+    "1": "M6 7 L11 2 V30 M6 30 H16",
+    "2": "M3 8 C3 0 17 0 17 8 C17 15 3 22 3 30 H17",
+    "3": "M3 4 C8 -1 17 1 16 8 C15 14 9 15 8 15 C18 15 18 30 10 30 C6 30 3 28 3 26",
+    "4": "M13 30 V2 L2 21 H18",
+    "5": "M16 2 H4 L3 14 C9 10 17 12 17 21 C17 31 6 32 3 27",
+    "6": "M15 3 C8 0 3 8 3 19 C3 27 6 30 10 30 C15 30 17 26 17 21 C17 16 14 13 10 13 C6 13 3 16 3 19",
+    "7": "M3 2 H17 L8 30",
+    "8": "M10 15 C3 15 3 2 10 2 C17 2 17 15 10 15 C2 15 2 30 10 30 C18 30 18 15 10 15 Z",
+    "9": "M17 13 C17 16 14 19 10 19 C6 19 3 16 3 11 C3 5 6 2 10 2 C14 2 17 6 17 13 C17 24 12 31 5 29",
+    "+": "M10 9 V25 M2 17 H18",
+    "-": "M3 17 H17",
+    "*": "M10 9 V25 M3 13 L17 21 M17 13 L3 21",
+    "=": "M3 13 H17 M3 21 H17",
+    "?": "M4 8 C4 0 16 0 16 8 C16 14 10 14 10 20 M10 26 V29",
+    " ": None,
+}
+
+HEIGHT = 80
+NOISE_DOTS = 120
+NOISE_STROKES = 8
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _color(low=100):
+    return f"#{random.randint(low, 255):02x}{random.randint(low, 255):02x}{random.randint(low, 255):02x}"
+
+
+def _perturb(path, amount=0.8):
+    # Every render gets slightly different outlines, so a glyph cannot be
+    # recognized by comparing path data against a lookup table.
+    return _NUMBER.sub(lambda m: f"{float(m.group()) + random.uniform(-amount, amount):.1f}", path)
+
+
+def render_svg(challenge):
+    elements = []
+    
+    x_pos = 20
+    for char in challenge:
+        path = GLYPH_PATHS.get(char)
+        if path is not None:
+            y_pos = 22 + random.randint(-5, 5)
+            transform = (
+                f"translate({x_pos} {y_pos}) "
+                f"rotate({random.uniform(-12, 12):.1f} 10 16) "
+                f"skewX({random.uniform(-8, 8):.1f}) "
+                f"scale({random.uniform(1.0, 1.2):.2f})"
+            )
+            elements.append(
+                f'<path d="{_perturb(path)}" stroke="#fff" stroke-opacity="0.9" '
+                f'stroke-width="{random.uniform(2.4, 3.2):.1f}" transform="{transform}"/>'
+            )
+        x_pos += random.randint(15, 25)
+    
+    width = max(220, x_pos + 20)
+    
+    for _ in range(NOISE_STROKES):
+        elements.append(
+            f'<path d="M{random.randint(0, width)} {random.randint(0, HEIGHT)} '
+            f'Q{random.randint(0, width)} {random.randint(0, HEIGHT)} '
+            f'{random.randint(0, width)} {random.randint(0, HEIGHT)}" '
+            f'stroke="{_color()}" stroke-width="{random.uniform(0.8, 1.6):.1f}"/>'
+        )
+    
+    dots = "".join(
+        f"M{random.randint(0, width)} {random.randint(0, HEIGHT)}h1"
+        for _ in range(NOISE_DOTS)
+    )
+    elements.append(f'<path d="{dots}" stroke="{_color(160)}" stroke-width="1.5"/>')
+    
+    random.shuffle(elements)
+    
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {HEIGHT}" width="220" height="80">'
+        f'<g fill="none" stroke-linecap="round" stroke-linejoin="round">{"".join(elements)}</g></svg>'
+    )
+
+
+def generate_svg_captcha():
+    challenge, answer = make_challenge()
+    
+    return {
+        'challenge': challenge,
+        'answer': answer,
+        'image': render_svg(challenge).encode(),
+        'mimetype': 'image/svg+xml',
+        'extension': 'svg'
+    }
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, namedtuple
+
+import config
+from shield import app, metrics
+from shield.database import db
+
+LOGGER = logging.getLogger(__name__)
+
+ChatInfo = namedtuple("ChatInfo", ("id", "title", "type", "username"))
+
+
+class ChatCache:
+    """Title, type and username of chats the bot works with, kept off the API.
+
+    Entries live for ``ttl`` seconds and the least recently used are evicted
+    past ``max_size``. Concurrent misses for one chat share a single get_chat
+    call. trackEvent and title-change service messages keep entries current,
+    and ``warm`` preloads the titles stored in the ``channels`` collection.
+    """
+
+    def __init__(self, collection, ttl=3600, max_size=5000):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._pending = {}
+
+    def put(self, chat_id, title, type=None, username=None, ttl=None):
+        self._entries[chat_id] = (ChatInfo(chat_id, title, type, username),
+                                  time.monotonic() + (ttl or self.ttl))
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        metrics.gauge("chat_cache.size", len(self._entries))
+
+    def update(self, chat):
+        """Store what a Pyrogram Chat (from an update or get_chat) says about itself."""
+        kind = getattr(chat.type, "value", chat.type)
+        self.put(chat.id, chat.title, kind, chat.username)
+        return self._entries[chat.id][0]
+
+    def invalidate(self, chat_id):
+        self._entries.pop(chat_id, None)
+
+    def warm(self):
+        count = 0
+        for doc in self.collection.find({}, {"chat_id": 1, "title": 1, "username": 1}):
+            if doc.get("title"):
+                self.put(doc["chat_id"], doc["title"], "channel", doc.get("username"))
+                count += 1
+        LOGGER.info(f"Chat cache warmed with {count} channels")
+
+    async def fetch(self, chat_id):
+        try:
+            return self.update(await app.get_chat(chat_id))
+        finally:
+            del self._pending[chat_id]
+
+    async def get(self, chat_id):
+        """ChatInfo for ``chat_id``; raises whatever get_chat raises on a miss."""
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._entries.move_to_end(chat_id)
+            metrics.incr("chat_cache.hits")
+            return entry[0]
+
+        metrics.incr("chat_cache.misses")
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = self._pending[chat_id] = asyncio.ensure_future(self.fetch(chat_id))
+        # Shielded so one caller giving up does not cancel the others' fetch.
+        return await asyncio.shield(pending)
+
+    async def title(self, chat_id):
+        """The chat's title, falling back to its id when it cannot be fetched."""
+        try:
+            return (await self.get(chat_id)).title or str(chat_id)
+        except Exception as e:
+            LOGGER.warning(f"Could not fetch chat {chat_id}: {e}")
+            return str(chat_id)
+
+
+chat_cache = ChatCache(
+    db["channels"],
+    ttl=config.CHAT_CACHE_TTL,
+    max_size=config.CHAT_CACHE_SIZE,
+)
@@ -1,3 +1,3 @@
-from .main import db
+from .main import db, adb
 
-__all__ = ("db",)
\ No newline at end of file
+__all__ = ("db", "adb")
\ No newline at end of file
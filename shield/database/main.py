@@ -1,7 +1,13 @@
 
 import config
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
 
 mongo = MongoClient(config.MONGO_DB_URI)
 
 db = mongo["MAIN"]
+
+# Motor client for code running on the bot's event loop (the ASGI site).
+amongo = AsyncIOMotorClient(config.MONGO_DB_URI)
+
+adb = amongo["MAIN"]
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+
+from pyrogram.errors import FloodWait
+
+import config
+from shield import app, metrics
+from shield.database import adb, db
+from shield.sender import Priority, sending_as
+
+LOGGER = logging.getLogger(__name__)
+
+
+async def mint_invite_link(channel_id, ttl=3600):
+    """A new single-use invite link to ``channel_id`` that expires after ``ttl`` seconds."""
+    expiration_time = datetime.utcnow() + timedelta(seconds=ttl)
+    try:
+        link = await app.create_chat_invite_link(
+            channel_id,
+            expire_date=expiration_time,
+            member_limit=1
+        )
+    except FloodWait:
+        raise
+    except Exception:
+        link = await app.create_chat_invite_link(
+            channel_id,
+            expire_date=int(expiration_time.timestamp()),
+            member_limit=1
+        )
+    return link.invite_link
+
+
+class InvitePool:
+    """Single-use invite links minted ahead of time for each protected channel.
+
+    Links are kept in Mongo so any web process can take one without calling
+    Telegram. The bot process keeps every ``captcha_on`` channel stocked in
+    proportion to its recent request rate, and revokes links that are too
+    close to expiry to hand out or whose channel is no longer protected.
+    Channels the bot is no longer admin of (gone from ``channels``) are not
+    stocked, and a channel whose minting fails is skipped with exponential
+    backoff so it cannot hold up the others.
+
+    ``requests``, ``configs`` and ``channels`` are Motor collections: the refill loop runs
+    on the bot's event loop and works through Motor (and ``async_links``) so
+    it never blocks update handling. ``links`` serves the sync ``take``.
+    """
+
+    def __init__(self, links, requests, configs, channels, link_ttl=7200, min_remaining=3600,
+                 min_size=1, max_size=10, window=600, interval=30, async_links=None):
+        self.links = links
+        # Motor view of ``links`` for the refill loop and async takers.
+        self.async_links = async_links
+        self.requests = requests
+        self.configs = configs
+        self.channels = channels
+        self.link_ttl = link_ttl
+        self.min_remaining = timedelta(seconds=min_remaining)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.window = window
+        self.interval = interval
+        # channel_id -> (consecutive failures, monotonic time to retry at)
+        self._failures = {}
+
+    def _take_query(self, channel_id):
+        return {"channel_id": channel_id, "expires_at": {"$gt": datetime.utcnow() + self.min_remaining}}
+
+    def take(self, channel_id):
+        """Hand out a pooled link for ``channel_id``, or None if the pool is dry."""
+        return self._taken(self.links.find_one_and_delete(self._take_query(channel_id), sort=[("expires_at", 1)]))
+
+    async def atake(self, channel_id):
+        """``take`` for callers on an event loop, through ``async_links``."""
+        return self._taken(await self.async_links.find_one_and_delete(
+            self._take_query(channel_id), sort=[("expires_at", 1)]
+        ))
+
+    def _taken(self, item):
+        if item is None:
+            metrics.incr("invite_pool.misses")
+            return None
+        metrics.incr("invite_pool.hits")
+        return item["link"]
+
+    async def targets(self):
+        """Pool size per protected channel, from requests seen over the last ``window``."""
+        protected = [cfg["channel_id"] async for cfg in self.configs.find({"captcha_on": True}, {"channel_id": 1})]
+        # captcha_on outlives the bot's admin rights; trackEvent only drops the channels entry.
+        channels = [doc["chat_id"] async for doc in self.channels.find({"chat_id": {"$in": protected}}, {"chat_id": 1})]
+        since = datetime.utcnow() - timedelta(seconds=self.window)
+        recent = {
+            row["_id"]: row["count"]
+            async for row in self.requests.aggregate([
+                {"$match": {"created_at": {"$gte": since}, "channel_id": {"$in": channels}}},
+                {"$group": {"_id": "$channel_id", "count": {"$sum": 1}}},
+            ])
+        }
+        # Enough for twice the demand expected before the next refill.
+        return {
+            channel_id: min(self.max_size,
+                            self.min_size + math.ceil(2 * recent.get(channel_id, 0) * self.interval / self.window))
+            for channel_id in channels
+        }
+
+    async def retire(self, query):
+        for item in await self.async_links.find(query).to_list(None):
+            try:
+                await app.revoke_chat_invite_link(item["channel_id"], item["link"])
+            except FloodWait:
+                raise
+            except Exception as e:
+                LOGGER.warning(f"Could not revoke pooled invite for {item['channel_id']}: {e}")
+            await self.async_links.delete_one({"_id": item["_id"]})
+            metrics.incr("invite_pool.retired")
+
+    async def stock(self, channel_id, target):
+        have = await self.async_links.count_documents({"channel_id": channel_id})
+        for _ in range(target - have):
+            link = await mint_invite_link(channel_id, ttl=self.link_ttl)
+            await self.async_links.insert_one({
+                "channel_id": channel_id,
+                "link": link,
+                "expires_at": datetime.utcnow() + timedelta(seconds=self.link_ttl),
+            })
+            metrics.incr("invite_pool.minted")
+
+    async def refill(self):
+        targets = await self.targets()
+        await self.retire({"$or": [
+            {"expires_at": {"$lte": datetime.utcnow() + self.min_remaining}},
+            {"channel_id": {"$nin": list(targets)}},
+        ]})
+
+        for channel_id, target in targets.items():
+            failures, retry_at = self._failures.get(channel_id, (0, 0))
+            if retry_at > time.monotonic():
+                continue
+            try:
+                await self.stock(channel_id, target)
+            except FloodWait:
+                raise
+            except Exception as e:
+                metrics.incr("invite_pool.errors")
+                delay = min(3600, self.interval * 2 ** failures)
+                LOGGER.warning(f"Could not stock invites for {channel_id}, retrying in {delay}s: {e}")
+                self._failures[channel_id] = (failures + 1, time.monotonic() + delay)
+                continue
+            self._failures.pop(channel_id, None)
+        metrics.gauge("invite_pool.depth", await self.async_links.count_documents({}))
+
+    async def run(self):
+        await self.async_links.create_index([("channel_id", 1), ("expires_at", 1)])
+        await self.async_links.create_index("expires_at", expireAfterSeconds=0)
+        while True:
+            try:
+                with sending_as(Priority.ALERT):
+                    await self.refill()
+            except FloodWait as ex:
+                LOGGER.warning(f"Invite pool refill paused: {ex}")
+                await asyncio.sleep(ex.value)
+            except Exception as e:
+                LOGGER.error(f"Invite pool refill failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+invite_pool = InvitePool(
+    db['invite_pool'],
+    adb['invite_requests'],
+    adb['channel_configs'],
+    adb['channels'],
+    link_ttl=config.INVITE_POOL_LINK_TTL,
+    min_remaining=config.INVITE_POOL_MIN_REMAINING,
+    min_size=config.INVITE_POOL_MIN,
+    max_size=config.INVITE_POOL_MAX,
+    window=config.INVITE_POOL_WINDOW,
+    interval=config.INVITE_POOL_INTERVAL,
+    async_links=adb['invite_pool'],
+)
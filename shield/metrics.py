@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+_lock = threading.Lock()
+
+counters = defaultdict(int)
+gauges = {}
+samples = defaultdict(lambda: deque(maxlen=512))
+events = defaultdict(lambda: deque(maxlen=4096))
+
+
+def incr(name, value=1):
+    with _lock:
+        counters[name] += value
+
+
+def gauge(name, value):
+    with _lock:
+        gauges[name] = value
+
+
+def adjust(name, delta):
+    with _lock:
+        gauges[name] = gauges.get(name, 0) + delta
+
+
+def observe(name, value):
+    with _lock:
+        samples[name].append((time.monotonic(), value))
+
+
+def mark(name):
+    with _lock:
+        events[name].append(time.monotonic())
+
+
+def rate(name, window=10.0):
+    cutoff = time.monotonic() - window
+    with _lock:
+        recent = sum(1 for stamp in events.get(name, ()) if stamp >= cutoff)
+    return recent / window
+
+
+def percentile(name, pct, window=None):
+    """``pct`` percentile of the kept samples, or of those from the last ``window`` seconds."""
+    cutoff = time.monotonic() - window if window else float("-inf")
+    with _lock:
+        values = sorted(value for stamp, value in samples.get(name, ()) if stamp >= cutoff)
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def snapshot():
+    with _lock:
+        data = {
+            "counters": dict(counters),
+            "gauges": dict(gauges),
+        }
+        series = {name: sorted(value for _, value in values) for name, values in samples.items()}
+
+    data["samples"] = {}
+    for name, values in series.items():
+        if not values:
+            continue
+        data["samples"][name] = {
+            "count": len(values),
+            "p50": values[(len(values) - 1) // 2],
+            "p95": values[int(round(0.95 * (len(values) - 1)))],
+            "max": values[-1],
+        }
+    return data
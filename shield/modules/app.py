@@ -3,6 +3,8 @@ from pyrogram import filters
 from pyrogram.types import CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, Message, WebAppInfo
 from shield import app
 from shield.database import db
+from shield.notify import notifications
+from shield.profiles import profile_of, profiles
 from datetime import datetime, timedelta
 import hashlib
 import config 
@@ -138,11 +140,16 @@ async def startcmd(_, message: Message):
 
     now = datetime.utcnow()
     uid = hashlib.sha1(f"{now.timestamp()}_{user_id}_{channel_id}".encode()).hexdigest()
+    # Kept with the request so verification can name the requester without
+    # resolving them again.
+    profile = profile_of(message.from_user)
+    profiles.remember(user_id, profile)
     entry = {
         "uid":         uid,
         "channel_id":  channel_id,
         "owner_id":    cfg["owner_id"],
         "requester":   user_id,
+        "profile":     profile,
         "created_at":  now,
         "expires_at":  now + timedelta(hours=1),
         "used":        False,
@@ -150,20 +157,17 @@ async def startcmd(_, message: Message):
     }
     invite_requests.insert_one(entry)
 
-    try:
-        chat = await app.get_chat(channel_id)
-        title = chat.title or str(channel_id)
-    except:
-        title = str(channel_id)
-
-    await app.send_message(
+    # The owner alert (and its chat title lookup) is delivered by the
+    # notification queue, so the requester gets their link straight away.
+    await notifications.aenqueue(
         cfg["owner_id"],
-        (
-            f"🔔 New access request for `{title}`\n"
-            f"User: {message.from_user.mention}\n"
-            f"Ray ID: `{uid}`\n"
-            f"Time: `{now.isoformat()}`"
-        )
+        "request",
+        requester=user_id,
+        digest=cfg.get("notify_digest", False),
+        profile=profile,
+        channel_id=channel_id,
+        uid=uid,
+        time=now.isoformat()
     )
 
     verify_url = f"https://mirza.ink/verify?uid={uid}"
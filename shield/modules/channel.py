@@ -2,6 +2,8 @@ from pyrogram import Client, filters, enums
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, Message
 import config
 from shield import app
+from shield.captcha import CAPTCHA_MODES
+from shield.chats import chat_cache
 from shield.database import db
 import re
 import ipaddress
@@ -37,12 +39,16 @@ async def config_handler(client: Client, message):
 async def select_chat(_, query: CallbackQuery):
     await query.answer()
     chat_id = int(query.data.split('_',2)[2])
-    chat = await app.get_chat(chat_id)
-    title = chat.title or str(chat_id)
+    title = await chat_cache.title(chat_id)
+    cfg = channel_configs.find_one({"channel_id": chat_id}) or {}
+    mode = cfg.get("captcha_mode") or config.CAPTCHA_MODE
+    alerts = "DIGEST" if cfg.get("notify_digest") else "INSTANT"
 
     buttons = [
         [InlineKeyboardButton("Captcha ON", callback_data=f"captcha_on_{chat_id}"),
          InlineKeyboardButton("Captcha OFF", callback_data=f"captcha_off_{chat_id}")],
+        [InlineKeyboardButton(f"Challenge: {mode.upper()}", callback_data=f"cmode_{chat_id}")],
+        [InlineKeyboardButton(f"Alerts: {alerts}", callback_data=f"ndig_{chat_id}")],
         [InlineKeyboardButton("Deny Access", callback_data=f"dn_ya_{chat_id}")],
         [InlineKeyboardButton("Back", callback_data="back_to_config")]
     ]
@@ -79,7 +85,7 @@ async def captcha_on(client: Client, query: CallbackQuery):
     )
     await query.answer("✅ Captcha enabled")
     await query.edit_message_text(
-        f"✅ Captcha is now enabled for: {(await app.get_chat(chat_id)).title or chat_id}\n\n"
+        f"✅ Captcha is now enabled for: {await chat_cache.title(chat_id)}\n\n"
         f"🔹 CHAT ID: `{chat_id}`\n"
         f"🔗 LINK: {generate_telegram_link(chat_id)}\n\n"
         f"⚠️ Share this link with users who want to join, instead of the actual group/channel link."
@@ -105,12 +111,39 @@ async def captcha_off(client: Client, query: CallbackQuery):
     # )
 
 
+@app.on_callback_query(filters.regex(r"^cmode_(-?\d+)$"))
+async def captcha_mode(_, query: CallbackQuery):
+    chat_id = int(query.data.split("_", 1)[1])
+    cfg = channel_configs.find_one({"channel_id": chat_id}) or {}
+    mode = cfg.get("captcha_mode") or config.CAPTCHA_MODE
+    next_mode = CAPTCHA_MODES[(CAPTCHA_MODES.index(mode) + 1) % len(CAPTCHA_MODES)] if mode in CAPTCHA_MODES else CAPTCHA_MODES[0]
+    channel_configs.update_one(
+        {"channel_id": chat_id},
+        {"$set": {"captcha_mode": next_mode}},
+        upsert=True
+    )
+    query.data = f"select_chat_{chat_id}"
+    await select_chat(_, query)
+
+
+@app.on_callback_query(filters.regex(r"^ndig_(-?\d+)$"))
+async def notify_digest(_, query: CallbackQuery):
+    chat_id = int(query.data.split("_", 1)[1])
+    cfg = channel_configs.find_one({"channel_id": chat_id}) or {}
+    channel_configs.update_one(
+        {"channel_id": chat_id},
+        {"$set": {"notify_digest": not cfg.get("notify_digest", False)}},
+        upsert=True
+    )
+    query.data = f"select_chat_{chat_id}"
+    await select_chat(_, query)
+
+
 @app.on_callback_query(filters.regex(r"^dn_ya_(-?\d+)$"))
 async def deny_access(_, query: CallbackQuery):
     await query.answer()
     chat_id = int(query.data.split("_", 2)[2])
-    chat = await app.get_chat(chat_id)
-    title = chat.title or str(chat_id)
+    title = await chat_cache.title(chat_id)
 
     admin_states[query.from_user.id] = {}
     buttons = [
@@ -127,8 +160,7 @@ async def deny_access(_, query: CallbackQuery):
 async def banned_ips(_, query: CallbackQuery):
     await query.answer()
     chat_id = int(query.data.split('_',2)[2])
-    chat = await app.get_chat(chat_id)
-    title = chat.title or str(chat_id)
+    title = await chat_cache.title(chat_id)
 
     admin_states[query.from_user.id] = {"action": None, "channel_id": chat_id}
     buttons = [
@@ -146,8 +178,7 @@ async def banned_ips(_, query: CallbackQuery):
 async def banned_tgids(_, query: CallbackQuery):
     await query.answer()
     chat_id = int(query.data.split('_',2)[2])
-    chat = await app.get_chat(chat_id)
-    title = chat.title or str(chat_id)
+    title = await chat_cache.title(chat_id)
 
     admin_states[query.from_user.id] = {"action": None, "channel_id": chat_id}
     buttons = [
@@ -1,106 +1,168 @@
-from flask import Flask, request, render_template_string, redirect, session, jsonify
-from datetime import datetime, timedelta
+from flask import Flask, Response, request, redirect, session, jsonify, abort
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import datetime
+from functools import lru_cache
+import hashlib
+import hmac
 import requests
-import random
-import string
-import base64
 import os
-from io import BytesIO
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import config
-from shield import app as telegram_bot
+from shield import app as telegram_bot, WEB_ROLE
+from shield import metrics
+from shield.captcha import captcha_pool, captcha_store, challenge_selector, verify_pow
+from shield.captcha.encode import MIMETYPES
 from shield.database import db
+from shield.invites import invite_pool
+from shield.notify import notifications
+from shield.web import Compression, StaticPage, assets, extract_assets, font_links
+from shield.web.bridge import BridgeBusy, LoopBridge, client_gone
+from shield.web.rpc import LocalRpc, RpcClient, RpcUnavailable
 
-app = Flask(__name__)
-app.secret_key = os.urandom(24)
+
+def session_secret():
+    """Key that signs session cookies; every web worker must derive the same one.
+
+    SECRET_KEY wins when set. Otherwise the key is derived from BOT_TOKEN,
+    which every role shares, so sessions survive worker hops and restarts.
+    """
+    if config.SECRET_KEY:
+        return config.SECRET_KEY
+    if config.BOT_TOKEN:
+        return hmac.new(config.BOT_TOKEN.encode(), b"shield-session", hashlib.sha256).digest()
+    if WEB_ROLE:
+        raise RuntimeError("Set SECRET_KEY (or BOT_TOKEN) so web workers accept each other's sessions")
+    return os.urandom(24)
+
+
+app = Flask(__name__, static_folder=None)
+app.secret_key = session_secret()
+# The site is served behind a TLS reverse proxy, so the client address is the
+# PROXY_HOPS-th entry from the end of X-Forwarded-For. Set PROXY_HOPS=0 only
+# when clients connect directly, or they can spoof their IP with that header.
+if config.PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_HOPS)
+Compression(app, min_size=config.COMPRESS_MIN_SIZE, level=config.COMPRESS_LEVEL)
+
+# Web workers with RPC_SOCKET hand Telegram work to the bot process;
+# otherwise it runs on this process's own client through the bridge.
+if WEB_ROLE and config.RPC_SOCKET:
+    rpc = RpcClient(config.RPC_SOCKET, timeout=config.RPC_TIMEOUT)
+else:
+    rpc = LocalRpc(LoopBridge(telegram_bot.loop,
+                              max_inflight=config.BRIDGE_MAX_INFLIGHT,
+                              timeout=config.BRIDGE_TIMEOUT))
 
 invite_requests = db['invite_requests']
 channel_configs = db['channel_configs']
 
-def generate_captcha():
-    operations = ['+', '-', '*']
-    operation = random.choice(operations)
-    
-    if operation == '+':
-        num1 = random.randint(1, 20)
-        num2 = random.randint(1, 20)
-        answer = num1 + num2
-    elif operation == '-':
-        num1 = random.randint(10, 30)
-        num2 = random.randint(1, 9)
-        answer = num1 - num2
-    else:
-        num1 = random.randint(1, 10)
-        num2 = random.randint(1, 10)
-        answer = num1 * num2
-    
-    challenge = f"{num1} {operation} {num2} = ?"
-    
-    width, height = 220, 80
-    image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(image)
-    
-    try:
-        font = ImageFont.truetype("arial.ttf", 48)
-    except IOError:
-        font = ImageFont.load_default()
-    
-    x_pos = 20
-    for char in challenge:
-        y_offset = random.randint(-5, 5)
-        draw.text((x_pos, 30 + y_offset), char, font=font, fill=(255, 255, 255, 230))
-        x_pos += random.randint(15, 25)
-    
-    for _ in range(300):
-        x = random.randint(0, width - 1)
-        y = random.randint(0, height - 1)
-        draw.point((x, y), fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)))
-    
-    for _ in range(8):
-        x1 = random.randint(0, width - 1)
-        y1 = random.randint(0, height - 1)
-        x2 = random.randint(0, width - 1)
-        y2 = random.randint(0, height - 1)
-        draw.line([(x1, y1), (x2, y2)], fill=(random.randint(100, 255), random.randint(100, 255), random.randint(100, 255)), width=1)
-    
-    image = image.filter(ImageFilter.GaussianBlur(radius=0.5))
+# Only processes that actually serve the site keep a stock of captchas.
+if WEB_ROLE or config.WEB_MODE != "external":
+    captcha_pool.start()
+
+
+def captcha_mode(cfg):
+    return (cfg or {}).get("captcha_mode") or config.CAPTCHA_MODE
+
+
+def remember_challenge(session, challenge, issued):
+    """Record an issued challenge in ``session`` and return its template values."""
+    session['challenge'] = challenge.name
     
-    buffer = BytesIO()
-    image.save(buffer, format="PNG")
-    img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    if challenge.kind == 'pow':
+        session['pow_salt'] = issued['salt']
+        session['pow_difficulty'] = issued['difficulty']
+        return {'pow': issued}
     
-    return {
-        'challenge': challenge,
-        'answer': str(answer),
-        'image': img_str
-    }
+    captcha_store.discard(session.get('captcha_token'))
+    token = captcha_store.put(issued['image'], issued['mimetype'])
+    session['captcha_answer'] = issued['answer']
+    session['captcha_token'] = token
+    return {'captcha_src': f"/captcha/{token}.{issued['extension']}"}
+
+
+def clear_challenge(session):
+    captcha_store.discard(session.pop('captcha_token', None))
+    session.pop('captcha_answer', None)
+    session.pop('captcha_mode', None)
+    session.pop('challenge', None)
+    session.pop('pow_difficulty', None)
+    session.pop('uid', None)
+    session.pop('channel_id', None)
+
+
+def telegram(op, **kwargs):
+    """Run a bot-side operation, cancelled if this request's client leaves."""
+    environ = request.environ
+    return rpc.call(op, abandon=lambda: client_gone(environ), **kwargs)
+
+
+def issue_challenge(cfg):
+    challenge = challenge_selector.select(session.get('captcha_mode'))
+    return remember_challenge(session, challenge, challenge.issue(cfg))
+
+
+def render_verify(uid, cfg, error=None, status=200):
+    return verify_template.render(uid=uid, 
+                                  ip_address=request.remote_addr,
+                                  error=error,
+                                  **issue_challenge(cfg)), status
+
+
+@app.before_request
+def track_request():
+    metrics.adjust("web.inflight", 1)
+
+
+@app.teardown_request
+def untrack_request(exc):
+    metrics.adjust("web.inflight", -1)
+
 
 @app.route('/')
 def landing_page():
-    return render_template_string(LANDING_TEMPLATE)
+    return LANDING_PAGE.response()
 
 @app.route('/verify')
 def verify():
+    metrics.mark("verify")
     uid = request.args.get('uid')
     entry = invite_requests.find_one({"uid": uid})
     if not entry or entry.get("used") or entry.get("expires_at") < datetime.utcnow():
-        return render_template_string(ERROR_TEMPLATE, error_message="Link expired or invalid."), 400
+        return render_error("Link expired or invalid.", 400).response()
     
     channel_id = entry.get("channel_id")
+    cfg = channel_configs.find_one({"channel_id": channel_id})
     
-    captcha = generate_captcha()
-    session['captcha_answer'] = captcha['answer']
+    session['captcha_mode'] = captcha_mode(cfg)
     session['uid'] = uid
     session['channel_id'] = channel_id
     
-    return render_template_string(VERIFY_TEMPLATE, 
-                                 uid=uid, 
-                                 captcha_image=captcha['image'])
+    return render_verify(uid, cfg)
+
+
+@app.route('/captcha/<token>.<ext>')
+def captcha_image(token, ext):
+    item = captcha_store.get(token)
+    if item is None or item[1] != MIMETYPES.get(ext):
+        abort(404)
+    
+    image, mimetype = item
+    response = Response(image, mimetype=mimetype)
+    response.headers['Cache-Control'] = f"private, max-age={config.CAPTCHA_TTL}, immutable"
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    return response
+
+
+@app.route('/metrics')
+def metrics_view():
+    if not config.METRICS_TOKEN or request.args.get('token') != config.METRICS_TOKEN:
+        abort(404)
+    return jsonify(metrics.snapshot())
 
 
 @app.route('/check-ip-ban', methods=['POST'])
 def check_ip_ban():
-    ip_address = request.json.get('ip')
+    ip_address = request.remote_addr
     channel_id = session.get('channel_id')
     
     if not ip_address or not channel_id:
@@ -118,76 +180,69 @@ def check_ip_ban():
 @app.route('/callback', methods=['POST'])
 def callback():
     uid = session.get('uid')
-    user_answer = request.form.get('captcha_answer')
-    correct_answer = session.get('captcha_answer')
-    ip_address = request.form.get('ip_address')
+    ip_address = request.remote_addr
+    
+    if session.get('challenge') == 'pow':
+        user_answer = request.form.get('pow_nonce')
+        correct_answer = session.pop('pow_salt', None)
+        solved = verify_pow(uid, correct_answer, user_answer, session.get('pow_difficulty', config.POW_MAX_DIFFICULTY))
+    else:
+        user_answer = request.form.get('captcha_answer')
+        correct_answer = session.get('captcha_answer')
+        solved = user_answer == correct_answer
     
     if not uid or not user_answer or not correct_answer or not ip_address:
-        return render_template_string(ERROR_TEMPLATE, error_message="Session expired or missing data. Please try again."), 400
+        return render_error("Session expired or missing data. Please try again.", 400).response()
     
     channel_id = session.get('channel_id')
     cfg = channel_configs.find_one({"channel_id": channel_id})
     if cfg:
         banned_ips = cfg.get("banned_ips", [])
         if ip_address in banned_ips:
-            return render_template_string(BANNED_TEMPLATE, error_message="Your IP address has been banned from accessing this handle."), 403
+            return render_banned("Your IP address has been banned from accessing this handle.", 403).response()
     
-    if user_answer != correct_answer:
+    if not solved:
         # Regenerate CAPTCHA for retry
-        captcha = generate_captcha()
-        session['captcha_answer'] = captcha['answer']
-        return render_template_string(VERIFY_TEMPLATE, 
-                                     uid=uid, 
-                                     captcha_image=captcha['image'],
-                                     error="Incorrect answer. Please try again."), 400
+        return render_verify(uid, cfg, error="Incorrect answer. Please try again.", status=400)
     
     entry = invite_requests.find_one({"uid": uid})
     if not entry or entry.get("used"):
-        return render_template_string(ERROR_TEMPLATE, error_message="This invitation has already been used."), 400
+        return render_error("This invitation has already been used.", 400).response()
 
     try:
-        expiration_time = datetime.utcnow() + timedelta(hours=1)
-        try:
-            link = telegram_bot.create_chat_invite_link(
-                entry["channel_id"],
-                expire_date=expiration_time,
-                member_limit=1
-            ).invite_link
-        except Exception:
-            link = telegram_bot.create_chat_invite_link(
-                entry["channel_id"],
-                expire_date=int(expiration_time.timestamp()),
-                member_limit=1
-            ).invite_link
+        # Normally a pre-minted link; Telegram is only called when the pool is dry.
+        link = (invite_pool.take(entry["channel_id"])
+                or telegram("create_invite_link", channel_id=entry["channel_id"]))
 
         invite_requests.update_one(
             {"uid": uid},
             {"$set": {"used": True, "invite_link": link}}
         )
 
-        requester = entry["requester"]
-        
         try:
-            mirza = telegram_bot.get_users(requester)
-            telegram_bot.send_message(
+            # Queued for the bot to deliver; the redirect does not wait on Telegram.
+            notifications.enqueue(
                 entry["owner_id"],
-                f"✅ Request `{uid}` VERIFIED\n"
-                f"User: {mirza.mention}\n"
-                f"IP: `{ip_address}`\n"
-                f"Invite: `{link}`\n"
-                f"Time: {datetime.utcnow().isoformat()}"
+                "verified",
+                requester=entry["requester"],
+                profile=entry.get("profile"),
+                digest=(cfg or {}).get("notify_digest", False),
+                channel_id=entry["channel_id"],
+                uid=uid,
+                ip_address=ip_address,
+                link=link
             )
         except Exception as e:
             print(f"Error sending notification: {e}")
 
         # Clear session
-        session.pop('captcha_answer', None)
-        session.pop('uid', None)
-        session.pop('channel_id', None)
+        clear_challenge(session)
         
         return redirect(link, code=302)
+    except (BridgeBusy, RpcUnavailable, TimeoutError):
+        return render_error("Verification is busy right now. Please try again in a moment.", 503).response()
     except Exception as e:
-        return render_template_string(ERROR_TEMPLATE, error_message=f"An error occurred: {str(e)}"), 500
+        return render_error(f"An error occurred: {str(e)}", 500).response()
 
 LANDING_TEMPLATE = """
 <!DOCTYPE html>
@@ -196,9 +251,7 @@ LANDING_TEMPLATE = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>TeleGuard - Advanced Telegram Channel Security</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800&display=swap" rel="stylesheet">
+    {{ font_links }}
     <style>
         :root {
             --telegram-dark: #17212b;
@@ -2401,19 +2454,32 @@ VERIFY_TEMPLATE = """
             </div>
             
             <div class="content">
+                {% if pow %}
+                <p>Your browser is completing a quick security check before you can access the Telegram channel.</p>
+                {% else %}
                 <p>Please solve the math problem below to verify you're human and access the Telegram channel.</p>
+                {% endif %}
                 
                 <form action="/callback" method="post" id="verification-form">
                     <input type="hidden" name="uid" value="{{uid}}">
-                    <input type="hidden" name="ip_address" id="ip-address">
+                    <input type="hidden" name="ip_address" id="ip-address" value="{{ip_address}}">
                     
                     <div class="captcha-container">
+                        {% if pow %}
+                        <div class="captcha-image" id="pow-challenge" data-uid="{{uid}}" data-salt="{{pow.salt}}" data-difficulty="{{pow.difficulty}}">
+                            Checking your browser&hellip;
+                        </div>
+                        <input type="hidden" name="pow_nonce" id="pow-nonce">
+                        {% else %}
                         <div class="captcha-image">
-                            <img src="data:image/png;base64,{{captcha_image}}" alt="CAPTCHA Challenge">
+                            <img src="{{captcha_src}}" width="220" height="80" alt="CAPTCHA Challenge">
                         </div>
+                        {% endif %}
                         
                         <div class="captcha-input">
+                            {% if not pow %}
                             <input type="text" name="captcha_answer" id="captcha-answer" placeholder="Enter the answer" required autocomplete="off">
+                            {% endif %}
                             {% if error %}
                             <div class="error-message">{{error}}</div>
                             {% endif %}
@@ -2423,9 +2489,11 @@ VERIFY_TEMPLATE = """
                     <button type="submit" id="submit-btn">Verify and Continue</button>
                 </form>
                 
+                {% if not pow %}
                 <div style="text-align: center; margin-top: 1rem;">
                     <a href="/verify?uid={{uid}}" class="refresh-captcha">Can't read? Get a new challenge</a>
                 </div>
+                {% endif %}
             </div>
             
             <div class="security-badge">
@@ -2446,16 +2514,9 @@ VERIFY_TEMPLATE = """
     </div>
     
     <script>
-        // Get user's IP address from ipify API
-        async function getIPAddress() {
-            try {
-                const response = await fetch('https://api.ipify.org/?format=json');
-                const data = await response.json();
-                return data.ip;
-            } catch (error) {
-                console.error('Error fetching IP:', error);
-                return null;
-            }
+        // User's IP address as seen by the server
+        function getIPAddress() {
+            return document.getElementById('ip-address').value || null;
         }
         
         // Check if IP is banned
@@ -2477,9 +2538,44 @@ VERIFY_TEMPLATE = """
             }
         }
         
+        function leadingZeroBits(bytes) {
+            let bits = 0;
+            for (const byte of bytes) {
+                if (byte !== 0) {
+                    return bits + Math.clz32(byte) - 24;
+                }
+                bits += 8;
+            }
+            return bits;
+        }
+        
+        // Proof-of-work challenge: find a nonce whose SHA-256 over
+        // "uid:salt:nonce" starts with the requested number of zero bits
+        async function solveProofOfWork(challenge) {
+            const encoder = new TextEncoder();
+            const prefix = challenge.dataset.uid + ':' + challenge.dataset.salt + ':';
+            const difficulty = parseInt(challenge.dataset.difficulty, 10);
+            const batch = 256;
+            
+            for (let start = 0; ; start += batch) {
+                const digests = await Promise.all(
+                    Array.from({ length: batch }, (_, i) =>
+                        crypto.subtle.digest('SHA-256', encoder.encode(prefix + (start + i))))
+                );
+                for (let i = 0; i < batch; i++) {
+                    if (leadingZeroBits(new Uint8Array(digests[i])) >= difficulty) {
+                        return start + i;
+                    }
+                }
+                if (start % (batch * 64) === 0) {
+                    challenge.textContent = 'Checking your browser\u2026 ' + start.toLocaleString() + ' attempts';
+                }
+            }
+        }
+        
         // Initialize the page
         async function initPage() {
-            const ipAddress = await getIPAddress();
+            const ipAddress = getIPAddress();
             if (ipAddress) {
                 document.getElementById('ip-address').value = ipAddress;
                 
@@ -2487,8 +2583,18 @@ VERIFY_TEMPLATE = """
                 const isBanned = await checkIPBan(ipAddress);
                 if (isBanned) {
                     window.location.href = '/banned';
+                    return;
                 }
             }
+            
+            const challenge = document.getElementById('pow-challenge');
+            if (challenge) {
+                document.getElementById('submit-btn').disabled = true;
+                const nonce = await solveProofOfWork(challenge);
+                document.getElementById('pow-nonce').value = nonce;
+                document.getElementById('loading-overlay').classList.add('active');
+                document.getElementById('verification-form').submit();
+            }
         }
         
         // Show loading overlay when form is submitted
@@ -2859,6 +2965,42 @@ BANNED_TEMPLATE = """
 
 @app.route('/banned')
 def banned():
-    return render_template_string(BANNED_TEMPLATE, error_message="Your IP address has been banned from accessing this channel."), 403
+    return BANNED_PAGE.response()
+
+
+@app.route('/static/<path:filename>')
+def static_asset(filename):
+    asset = assets.get(filename)
+    if asset is None:
+        abort(404)
+    return asset.response()
+
+
+# Compile every template once at import instead of on each request
+# (render_template_string parses and compiles its source on every call).
+# Inline CSS/JS is split out into fingerprinted /static/ assets first.
+landing_template = app.jinja_env.from_string(extract_assets("landing", LANDING_TEMPLATE))
+verify_template = app.jinja_env.from_string(extract_assets("verify", VERIFY_TEMPLATE))
+error_template = app.jinja_env.from_string(extract_assets("error", ERROR_TEMPLATE))
+banned_template = app.jinja_env.from_string(extract_assets("banned", BANNED_TEMPLATE))
+
+# Pages with no per-request data are rendered and compressed once.
+LANDING_PAGE = StaticPage(
+    landing_template.render(font_links=font_links()),
+    cache_control=f"public, max-age={config.STATIC_PAGE_MAX_AGE}"
+)
+BANNED_PAGE = StaticPage(
+    banned_template.render(error_message="Your IP address has been banned from accessing this channel."),
+    status=403,
+    cache_control=f"public, max-age={config.STATIC_PAGE_MAX_AGE}"
+)
+
+
+@lru_cache(maxsize=64)
+def render_error(error_message, status=400):
+    return StaticPage(error_template.render(error_message=error_message), status=status, cache_control="no-cache")
 
 
+@lru_cache(maxsize=16)
+def render_banned(error_message, status=403):
+    return StaticPage(banned_template.render(error_message=error_message), status=status, cache_control="no-cache")
@@ -1,13 +1,25 @@
 from datetime import datetime, timedelta
 import pytz
-from pyrogram import Client, enums
+from pyrogram import Client, enums, filters
 import config
 from shield import app
-from pyrogram.types import ChatMemberUpdated
+from pyrogram.types import ChatMemberUpdated, Message
+from shield.chats import chat_cache
 from shield.database import db
+from shield.sender import Priority, WriteShed, sending_as
 
 channels = db["channels"]
 
+
+async def send_log(text):
+    """Post ``text`` to LOG_ID as a LOG-class write, dropping it if it is shed."""
+    try:
+        with sending_as(Priority.LOG):
+            await app.send_message(config.LOG_ID, text)
+    except WriteShed:
+        pass
+
+
 @app.on_chat_member_updated()
 async def trackEvent(client: Client, update: ChatMemberUpdated):
     old = update.old_chat_member
@@ -25,24 +37,32 @@ async def trackEvent(client: Client, update: ChatMemberUpdated):
 
         info = await client.get_chat_member(chat.id, inviter.id)
         if info.status == enums.ChatMemberStatus.OWNER:
+            chat_cache.update(chat)
             channels.update_one(
                 {"chat_id": chat.id},
                 {"$set": {
                     "chat_id":   chat.id,
                     "owner_id":  inviter.id,
-                    "title":     chat.title or ""
+                    "title":     chat.title or "",
+                    "username":  chat.username
                 }},
                 upsert=True
             )
-            await app.send_message(
-                config.LOG_ID,
+            await send_log(
                 f"✅ Added to channel `{chat.id}` by user {inviter.mention} titled `{chat.title}`"
             )
 
     elif old.status == enums.ChatMemberStatus.ADMINISTRATOR and \
          new.status != enums.ChatMemberStatus.ADMINISTRATOR:
+        chat_cache.invalidate(chat.id)
         channels.delete_one({"chat_id": chat.id})
-        await app.send_message(
-            config.LOG_ID,
-            f"🗑️ Removed from channel `{chat.id}`"
-        )
+        await send_log(f"🗑️ Removed from channel `{chat.id}`")
+
+
+@app.on_message(filters.new_chat_title)
+async def trackTitle(client: Client, message: Message):
+    chat_cache.invalidate(message.chat.id)
+    channels.update_one(
+        {"chat_id": message.chat.id},
+        {"$set": {"title": message.new_chat_title or ""}}
+    )
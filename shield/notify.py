@@ -0,0 +1,299 @@
+import asyncio
+import csv
+import io
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument
+from pyrogram.errors import FloodWait
+
+import config
+from shield import app, metrics
+from shield.chats import chat_cache
+from shield.database import adb, db
+from shield.profiles import fallback_profile, profiles
+from shield.sender import Priority, SendDeferred, sending_as
+
+LOGGER = logging.getLogger(__name__)
+
+TEMPLATES = {
+    "request": (
+        "🔔 New access request for `{title}`\n"
+        "User: {mention}\n"
+        "Ray ID: `{uid}`\n"
+        "Time: `{time}`"
+    ),
+    "verified": (
+        "✅ Request `{uid}` VERIFIED\n"
+        "User: {mention}\n"
+        "IP: `{ip_address}`\n"
+        "Invite: `{link}`\n"
+        "Time: {time}"
+    ),
+}
+
+# One line per event in a digest message.
+DIGEST_LINES = {
+    "request": "🔔 `{title}` · {mention} · `{uid}`",
+    "verified": "✅ {mention} · `{uid}` · IP `{ip_address}`",
+}
+
+DIGEST_COLUMNS = ("time", "kind", "channel_id", "user_id", "name", "username", "uid", "ip_address", "link")
+
+
+class NotificationQueue:
+    """Durable outbox for owner notifications, delivered by a bot-side consumer.
+
+    Producers (bot handlers or web workers in any process) insert a document
+    and return at once. Consumers claim due documents under a lease, so a
+    crashed delivery is picked up again once the lease runs out. Failures are
+    retried with exponential backoff up to ``max_attempts``. Sends are made
+    as ALERT-class writes, behind replies to users, with a ``send_patience``:
+    a FloodWait, or a wait of more than that for the owner's send bucket,
+    comes straight back and reschedules the document without spending an
+    attempt. A delivery therefore never holds its claim for much longer than
+    one API call, well inside ``lease``, and one busy owner does not hold up
+    the others, in the consumers or in the digester.
+
+    Notifications queued with ``digest=True`` wait instead, and every
+    ``digest_window`` seconds each owner's waiting events go out together as
+    one message, or as a CSV attachment past ``digest_max_lines`` events.
+    """
+
+    def __init__(self, collection, workers=2, max_attempts=8, backoff=5.0, lease=60, poll=1.0,
+                 digest_window=300, digest_max_lines=25, send_patience=2.0, async_collection=None):
+        self.collection = collection
+        # Motor view of ``collection``, for producers on the bot's loop and for
+        # the consumers and digester, which must not block it.
+        self.async_collection = async_collection
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = timedelta(seconds=lease)
+        self.poll = poll
+        self.digest_window = timedelta(seconds=digest_window)
+        self.digest_max_lines = digest_max_lines
+        self.send_patience = send_patience
+        self._wake = None
+
+    def enqueue(self, chat_id, kind, requester=None, digest=False, profile=None, **data):
+        """Queue a ``kind`` notification (see TEMPLATES) for ``chat_id``.
+
+        Pass the requester's stored ``profile`` (see profile_of) and ``title``
+        in ``data`` when at hand; otherwise they are resolved from
+        ``requester`` and ``channel_id`` at delivery time, off the producer's
+        path.
+        """
+        self.collection.insert_one(self._document(chat_id, kind, requester, digest, profile, data))
+        metrics.incr("notify.enqueued")
+        if self._wake is not None:
+            app.loop.call_soon_threadsafe(self._wake.set)
+
+    async def aenqueue(self, chat_id, kind, requester=None, digest=False, profile=None, **data):
+        """``enqueue`` for producers on the bot's event loop, through ``async_collection``."""
+        await self.async_collection.insert_one(self._document(chat_id, kind, requester, digest, profile, data))
+        metrics.incr("notify.enqueued")
+        if self._wake is not None:
+            self._wake.set()
+
+    def _document(self, chat_id, kind, requester, digest, profile, data):
+        now = datetime.utcnow()
+        data.setdefault("time", now.isoformat())
+        return {
+            "chat_id": chat_id,
+            "kind": kind,
+            "requester": requester,
+            "profile": profile,
+            "data": data,
+            "status": "digest" if digest else "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now,
+        }
+
+    async def claim(self):
+        now = datetime.utcnow()
+        return await self.async_collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lte": now}},
+            ]},
+            {"$set": {"status": "sending", "lease_until": now + self.lease}, "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def render(self, item):
+        template = TEMPLATES[item["kind"]]
+        data = dict(item["data"])
+        if "{title}" in template and "title" not in data:
+            data["title"] = await chat_cache.title(data["channel_id"])
+        if "{mention}" in template and "mention" not in data:
+            profile = item.get("profile") or await profiles.get(item["requester"])
+            data["mention"] = profile["mention"]
+        return template.format(**data)
+
+    async def deliver(self, item):
+        try:
+            await app.send_message(item["chat_id"], await self.render(item))
+        except (FloodWait, SendDeferred) as ex:
+            metrics.incr("notify.deferred" if isinstance(ex, SendDeferred) else "notify.flood_waits")
+            await self.async_collection.update_one({"_id": item["_id"]}, {
+                "$set": {"status": "pending", "next_attempt_at": datetime.utcnow() + timedelta(seconds=ex.value)},
+                "$inc": {"attempts": -1},
+            })
+            return
+        except Exception as e:
+            if item["attempts"] >= self.max_attempts:
+                metrics.incr("notify.failed")
+                LOGGER.error(f"Giving up on notification {item['_id']}: {e}")
+                await self.async_collection.update_one({"_id": item["_id"]}, {
+                    "$set": {"status": "failed", "error": str(e), "done_at": datetime.utcnow()},
+                })
+                return
+            metrics.incr("notify.retries")
+            delay = self.backoff * 2 ** (item["attempts"] - 1)
+            await self.async_collection.update_one({"_id": item["_id"]}, {
+                "$set": {"status": "pending", "error": str(e),
+                         "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay)},
+            })
+            return
+
+        metrics.incr("notify.sent")
+        metrics.observe("notify.delay", (datetime.utcnow() - item["created_at"]).total_seconds())
+        await self.async_collection.update_one({"_id": item["_id"]}, {
+            "$set": {"status": "sent", "done_at": datetime.utcnow()},
+        })
+
+    async def resolve_profiles(self, items):
+        """Requester profiles for ``items``, looking up only those stored without one."""
+        found = {item["requester"]: item["profile"] for item in items if item.get("profile")}
+        found.update(await profiles.get_many(item["requester"] for item in items
+                                             if item["requester"] not in found))
+        return found
+
+    async def resolve_titles(self, channel_ids):
+        return {channel_id: await chat_cache.title(channel_id) for channel_id in set(channel_ids)}
+
+    async def send_digest(self, chat_id, items):
+        users = await self.resolve_profiles(items)
+        titles = await self.resolve_titles(item["data"]["channel_id"] for item in items
+                                           if "channel_id" in item["data"])
+        counts = {}
+        for item in items:
+            counts[item["kind"]] = counts.get(item["kind"], 0) + 1
+        summary = (f"📋 {len(items)} events since {items[0]['data']['time'][:16]}: "
+                   + ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items())))
+
+        if len(items) <= self.digest_max_lines:
+            lines = [summary, ""]
+            for item in items:
+                data = dict(item["data"])
+                user = users.get(item["requester"]) or fallback_profile(item["requester"])
+                data.setdefault("mention", user["mention"])
+                data.setdefault("title", titles.get(data.get("channel_id"), ""))
+                lines.append(DIGEST_LINES[item["kind"]].format(**data))
+            await app.send_message(chat_id, "\n".join(lines))
+            return
+
+        rows = io.StringIO()
+        writer = csv.DictWriter(rows, DIGEST_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        for item in items:
+            user = users.get(item["requester"]) or {}
+            writer.writerow(dict(
+                item["data"],
+                kind=item["kind"],
+                user_id=item["requester"],
+                name=user.get("name", ""),
+                username=user.get("username", ""),
+            ))
+        document = io.BytesIO(rows.getvalue().encode())
+        document.name = f"digest-{datetime.utcnow():%Y%m%d-%H%M}.csv"
+        await app.send_document(chat_id, document, caption=summary)
+
+    async def flush_digests(self):
+        now = datetime.utcnow()
+        due = {"$or": [
+            {"status": "digest", "created_at": {"$lte": now - self.digest_window}, "next_attempt_at": {"$lte": now}},
+            {"status": "digesting", "lease_until": {"$lte": now}},
+        ]}
+        for chat_id in await self.async_collection.distinct("chat_id", due):
+            items = await self.async_collection.find(
+                {"chat_id": chat_id, "status": {"$in": ["digest", "digesting"]}}
+            ).sort("created_at", 1).to_list(None)
+            ids = [item["_id"] for item in items]
+            await self.async_collection.update_many({"_id": {"$in": ids}}, {
+                "$set": {"status": "digesting", "lease_until": now + self.lease},
+                "$inc": {"attempts": 1},
+            })
+            try:
+                await self.send_digest(chat_id, items)
+            except (FloodWait, SendDeferred) as ex:
+                # Only this owner's digest waits; the attempt is given back.
+                metrics.incr("notify.deferred" if isinstance(ex, SendDeferred) else "notify.flood_waits")
+                await self.async_collection.update_many({"_id": {"$in": ids}}, {
+                    "$set": {"status": "digest", "next_attempt_at": datetime.utcnow() + timedelta(seconds=ex.value)},
+                    "$inc": {"attempts": -1},
+                })
+                continue
+            except Exception as e:
+                failed = max(item["attempts"] for item in items) + 1 >= self.max_attempts
+                metrics.incr("notify.failed" if failed else "notify.retries")
+                LOGGER.error(f"Digest for {chat_id} failed: {e}")
+                await self.async_collection.update_many({"_id": {"$in": ids}}, {"$set": {
+                    "status": "failed" if failed else "digest",
+                    "error": str(e),
+                    **({"done_at": datetime.utcnow()} if failed else {}),
+                }})
+                continue
+
+            metrics.incr("notify.digests")
+            metrics.incr("notify.sent", len(items))
+            await self.async_collection.update_many({"_id": {"$in": ids}}, {
+                "$set": {"status": "sent", "done_at": datetime.utcnow()},
+            })
+
+    async def digester(self):
+        while True:
+            await asyncio.sleep(min(30, self.digest_window.total_seconds()))
+            try:
+                with sending_as(Priority.ALERT, patience=self.send_patience):
+                    await self.flush_digests()
+            except Exception as e:
+                LOGGER.error(f"Digest flush failed: {e}")
+
+    async def consume(self):
+        while True:
+            try:
+                item = await self.claim()
+            except Exception as e:
+                LOGGER.error(f"Notification queue unavailable: {e}")
+                item = None
+            if item is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            with sending_as(Priority.ALERT, patience=self.send_patience):
+                await self.deliver(item)
+
+    async def run(self):
+        await self.async_collection.create_index([("status", 1), ("next_attempt_at", 1)])
+        # Delivered and abandoned notifications are kept for a day.
+        await self.async_collection.create_index("done_at", expireAfterSeconds=86400)
+        self._wake = asyncio.Event()
+        await asyncio.gather(self.digester(), *(self.consume() for _ in range(self.workers)))
+
+
+notifications = NotificationQueue(
+    db['notifications'],
+    workers=config.NOTIFY_WORKERS,
+    max_attempts=config.NOTIFY_MAX_ATTEMPTS,
+    backoff=config.NOTIFY_BACKOFF,
+    digest_window=config.NOTIFY_DIGEST_WINDOW,
+    digest_max_lines=config.NOTIFY_DIGEST_MAX_LINES,
+    async_collection=adb['notifications'],
+)
@@ -0,0 +1,76 @@
+import logging
+import time
+from collections import OrderedDict
+
+import config
+from shield import app, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+
+def profile_of(user):
+    """The display data kept for a requester: name, username and mention markup."""
+    name = " ".join(filter(None, (user.first_name, user.last_name))) or str(user.id)
+    return {"name": name, "username": user.username or "", "mention": str(user.mention)}
+
+
+def fallback_profile(user_id):
+    return {"name": str(user_id), "username": "", "mention": f"`{user_id}`"}
+
+
+class ProfileCache:
+    """Requester profiles for notifications whose request predates profile capture.
+
+    Requests store the requester's profile when they are created, so this is
+    only consulted for the rare item without one. Profiles seen by the bot
+    are remembered here too, which covers most of those without an API call.
+    """
+
+    def __init__(self, ttl=3600, max_size=1000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def remember(self, user_id, profile):
+        self._entries[user_id] = (profile, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def cached(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[0]
+
+    async def get_many(self, user_ids):
+        """Profiles by user id, fetching misses with one get_users call per 200 ids."""
+        profiles = {}
+        missing = []
+        for user_id in dict.fromkeys(filter(None, user_ids)):
+            profile = self.cached(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                profiles[user_id] = profile
+        metrics.incr("profiles.hits", len(profiles))
+        metrics.incr("profiles.misses", len(missing))
+
+        for start in range(0, len(missing), 200):
+            batch = missing[start:start + 200]
+            try:
+                users = await app.get_users(batch)
+            except Exception as e:
+                LOGGER.warning(f"Could not resolve {len(batch)} users: {e}")
+                continue
+            for user in users:
+                profiles[user.id] = profile_of(user)
+                self.remember(user.id, profiles[user.id])
+        return profiles
+
+    async def get(self, user_id):
+        return (await self.get_many([user_id])).get(user_id) or fallback_profile(user_id)
+
+
+profiles = ProfileCache(ttl=config.PROFILE_CACHE_TTL, max_size=config.PROFILE_CACHE_SIZE)
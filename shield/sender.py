@@ -0,0 +1,265 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+
+from pyrogram.errors import FloodWait
+
+from shield import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+# Raw API functions that count against Telegram's send limits.
+WRITE_PREFIXES = (
+    "Send",
+    "Edit",
+    "Forward",
+    "Delete",
+    "SetBotCallbackAnswer",
+    "ExportChatInvite",
+)
+
+
+class WriteShed(Exception):
+    """A LOG-class write was dropped because the send queue is backed up."""
+
+
+class SendDeferred(Exception):
+    """A write sent with a ``patience`` would have had to wait longer than that.
+
+    ``value`` is the wait in seconds, as on FloodWait, so callers can
+    reschedule the write instead of holding on to it.
+    """
+
+    def __init__(self, value):
+        super().__init__(f"send deferred for {value:.1f}s")
+        self.value = value
+
+
+class Priority(IntEnum):
+    """Outbound traffic classes; lower values are sent first."""
+
+    INTERACTIVE = 0
+    CALLBACK = 1
+    ALERT = 2
+    LOG = 3
+
+
+current_priority = ContextVar("current_priority", default=Priority.INTERACTIVE)
+current_patience = ContextVar("current_patience", default=None)
+
+
+@contextmanager
+def sending_as(priority, patience=None):
+    """Send every write made inside the block with ``priority``.
+
+    With a ``patience`` (seconds), a write that would wait longer than that
+    for its buckets raises SendDeferred, and a FloodWait is raised straight
+    back after penalizing the bucket, instead of being waited out.
+    """
+    priority_token = current_priority.set(priority)
+    patience_token = current_patience.set(patience)
+    try:
+        yield
+    finally:
+        current_patience.reset(patience_token)
+        current_priority.reset(priority_token)
+
+
+def priority_of(query):
+    if type(query).__name__ == "SetBotCallbackAnswer":
+        return Priority.CALLBACK
+    return current_priority.get()
+
+
+def is_write(query):
+    return type(query).__name__.startswith(WRITE_PREFIXES)
+
+
+def peer_of(query):
+    """``("private" | "group", id)`` for the chat a raw query targets, or None."""
+    peer = getattr(query, "peer", None) or getattr(query, "channel", None)
+    if hasattr(peer, "channel_id"):
+        return "group", peer.channel_id
+    if hasattr(peer, "chat_id"):
+        return "group", peer.chat_id
+    if hasattr(peer, "user_id"):
+        return "private", peer.user_id
+    return None
+
+
+class TokenBucket:
+    """Token bucket whose tokens may go negative, so reservations queue in order.
+
+    A FloodWait halves the rate and blocks the bucket for the wait Telegram
+    asked for, after which queued reservations drain at the lowered rate;
+    each success wins back a tenth of the configured rate.
+    """
+
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        # Tokens accrue from here on; a FloodWait pushes it into the future.
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        return now
+
+    def reserve(self):
+        """Take a token and return how long to wait before using it."""
+        now = self.refill()
+        self.tokens -= 1
+        return max(0.0, self.updated - now) + max(0.0, -self.tokens) / self.rate
+
+    def try_take(self):
+        now = self.refill()
+        if self.updated <= now and self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def next_token(self):
+        """Seconds until a whole token is available."""
+        now = self.refill()
+        return max(0.0, self.updated - now) + max(0.0, 1 - self.tokens) / self.rate
+
+    def penalize(self, seconds):
+        self.rate = max(self.base_rate / 16, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)
+        self.updated = max(self.updated, time.monotonic() + seconds)
+
+    def recover(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+
+class SendScheduler:
+    """Paces every Telegram write through a global and a per-chat token bucket.
+
+    Bursts wait for tokens instead of failing. Callers waiting on the global
+    bucket are served by Priority, then arrival; once ``shed_backlog`` callers
+    are waiting on either bucket, new LOG-class writes raise WriteShed instead
+    of queueing. A FloodWait blocks the offending chat's bucket (or the global
+    one when there is no chat) and the call is retried once the wait is over.
+    Only waits longer than ``max_flood_wait`` are raised to the caller, unless
+    it sends with a patience (see sending_as).
+    """
+
+    def __init__(self, global_rate=30, global_burst=30, private_rate=1.0, private_burst=3,
+                 group_rate=20 / 60, group_burst=5, max_flood_wait=300, max_chats=10000,
+                 shed_backlog=50):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.limits = {
+            "private": (private_rate, private_burst),
+            "group": (group_rate, group_burst),
+        }
+        self.max_flood_wait = max_flood_wait
+        self.max_chats = max_chats
+        self.shed_backlog = shed_backlog
+        self._chats = OrderedDict()
+        self._queued = 0
+        self._waiting = []
+        self._order = itertools.count()
+        self._dispatcher = None
+
+    def bucket(self, peer):
+        bucket = self._chats.get(peer)
+        if bucket is None:
+            bucket = self._chats[peer] = TokenBucket(*self.limits[peer[0]])
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(peer)
+        return bucket
+
+    async def dispatch(self):
+        """Hand out global tokens to waiting callers, highest priority first."""
+        while self._waiting:
+            delay = self.global_bucket.next_token()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                self.global_bucket.tokens -= 1
+                future.set_result(None)
+        self._dispatcher = None
+
+    async def acquire_global(self, priority):
+        if not self._waiting and self.global_bucket.try_take():
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._order), future))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.ensure_future(self.dispatch())
+        await future
+
+    async def wait_turn(self, chat_bucket, priority):
+        started = time.perf_counter()
+        self._queued += 1
+        metrics.gauge("sender.queued", self._queued)
+        try:
+            if chat_bucket is not None:
+                delay = chat_bucket.reserve()
+                if delay:
+                    await asyncio.sleep(delay)
+            await self.acquire_global(priority)
+        finally:
+            self._queued -= 1
+            metrics.gauge("sender.queued", self._queued)
+        metrics.observe(f"sender.wait.{priority.name.lower()}", time.perf_counter() - started)
+
+    async def invoke(self, invoke, query, *args, **kwargs):
+        """Run ``invoke(query)`` for a write once the buckets allow it.
+
+        Raises WriteShed without sending when a LOG-class write is shed, and
+        SendDeferred or FloodWait when a caller with a patience would wait.
+        """
+        priority = priority_of(query)
+        patience = current_patience.get()
+        # Waiters sleeping on a chat bucket (log writes pile up on LOG_ID's)
+        # count too, not only those queued for the global bucket.
+        if priority == Priority.LOG and self._queued >= self.shed_backlog:
+            metrics.incr("sender.shed")
+            raise WriteShed(type(query).__name__)
+
+        peer = peer_of(query)
+        chat_bucket = self.bucket(peer) if peer else None
+        # FloodWait must reach us rather than be slept on inside Pyrogram.
+        kwargs["sleep_threshold"] = 0
+
+        while True:
+            if patience is not None:
+                delay = max(chat_bucket.next_token() if chat_bucket else 0.0, self.global_bucket.next_token())
+                if delay > patience:
+                    metrics.incr("sender.deferred")
+                    raise SendDeferred(delay)
+            await self.wait_turn(chat_bucket, priority)
+            try:
+                result = await invoke(query, *args, **kwargs)
+            except FloodWait as ex:
+                metrics.incr("sender.flood_waits")
+                metrics.observe("sender.flood_wait", ex.value)
+                if ex.value > self.max_flood_wait:
+                    raise
+                LOGGER.warning(f"FloodWait {ex.value}s on {type(query).__name__} to {peer}")
+                (chat_bucket or self.global_bucket).penalize(ex.value)
+                if patience is not None:
+                    raise
+                continue
+
+            if chat_bucket is not None:
+                chat_bucket.recover()
+            self.global_bucket.recover()
+            metrics.incr("sender.sent")
+            return result
@@ -0,0 +1,14 @@
+from .compress import Compression, compressed_cache
+from .pages import StaticPage
+from .assets import assets, extract_assets, register_asset
+from .fonts import font_links
+
+__all__ = (
+    "Compression",
+    "compressed_cache",
+    "StaticPage",
+    "assets",
+    "extract_assets",
+    "register_asset",
+    "font_links",
+)
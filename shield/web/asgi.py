@@ -0,0 +1,229 @@
+import asyncio
+from datetime import datetime
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+from hypercorn.middleware import ProxyFixMiddleware
+from quart import Quart, Response, abort, jsonify, redirect, request, session
+from quart.wrappers.response import DataBody
+
+import config
+from shield import LOGGER, metrics
+from shield.captcha import captcha_store, challenge_selector, verify_pow
+from shield.captcha.encode import MIMETYPES
+from shield.database import adb
+from shield.invites import invite_pool
+from shield.notify import notifications
+from shield.modules.site import (
+    BANNED_PAGE,
+    LANDING_PAGE,
+    captcha_mode,
+    clear_challenge,
+    remember_challenge,
+    render_banned,
+    render_error,
+    session_secret,
+    verify_template,
+)
+from shield.web import assets
+from shield.web.compress import Compression, negotiate
+from shield.web.ops import create_invite_link
+
+# The ASGI site runs on the bot's loop, where the pymongo-backed captcha
+# store would block every update while it waits on Mongo.
+if config.CAPTCHA_STORE == "mongo":
+    raise RuntimeError("WEB_MODE=asgi serves captchas from the bot process; use CAPTCHA_STORE=memory")
+
+app = Quart(__name__, static_folder=None)
+app.secret_key = session_secret()
+
+invite_requests = adb['invite_requests']
+channel_configs = adb['channel_configs']
+
+
+compression = Compression(min_size=config.COMPRESS_MIN_SIZE, level=config.COMPRESS_LEVEL)
+
+
+def page(static_page):
+    return static_page.response(request, Response)
+
+
+async def issue_challenge(cfg):
+    challenge = challenge_selector.select(session.get('captcha_mode'))
+    # Rendering an image captcha is CPU work; keep it off the bot's loop.
+    issued = await asyncio.to_thread(challenge.issue, cfg)
+    return remember_challenge(session, challenge, issued)
+
+
+async def render_verify(uid, cfg, error=None, status=200):
+    return verify_template.render(uid=uid,
+                                  ip_address=request.remote_addr,
+                                  error=error,
+                                  **await issue_challenge(cfg)), status
+
+
+@app.before_request
+async def track_request():
+    metrics.adjust("web.inflight", 1)
+
+
+@app.after_request
+async def compress_response(response):
+    # Only in-memory bodies; file and streamed bodies go out as they are.
+    if not isinstance(response.response, DataBody) or compression.skips(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    coding = negotiate(request)
+    if coding is None:
+        return response
+    return compression.encode(response, await response.get_data(), coding)
+
+
+@app.teardown_request
+async def untrack_request(exc):
+    metrics.adjust("web.inflight", -1)
+
+
+@app.route('/')
+async def landing_page():
+    return page(LANDING_PAGE)
+
+
+@app.route('/verify')
+async def verify():
+    metrics.mark("verify")
+    uid = request.args.get('uid')
+    entry = await invite_requests.find_one({"uid": uid})
+    if not entry or entry.get("used") or entry.get("expires_at") < datetime.utcnow():
+        return page(render_error("Link expired or invalid.", 400))
+
+    channel_id = entry.get("channel_id")
+    cfg = await channel_configs.find_one({"channel_id": channel_id})
+
+    session['captcha_mode'] = captcha_mode(cfg)
+    session['uid'] = uid
+    session['channel_id'] = channel_id
+
+    return await render_verify(uid, cfg)
+
+
+@app.route('/captcha/<token>.<ext>')
+async def captcha_image(token, ext):
+    item = captcha_store.get(token)
+    if item is None or item[1] != MIMETYPES.get(ext):
+        abort(404)
+
+    image, mimetype = item
+    response = Response(image, mimetype=mimetype)
+    response.headers['Cache-Control'] = f"private, max-age={config.CAPTCHA_TTL}, immutable"
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+    return response
+
+
+@app.route('/static/<path:filename>')
+async def static_asset(filename):
+    asset = assets.get(filename)
+    if asset is None:
+        abort(404)
+    return page(asset)
+
+
+@app.route('/metrics')
+async def metrics_view():
+    if not config.METRICS_TOKEN or request.args.get('token') != config.METRICS_TOKEN:
+        abort(404)
+    return jsonify(metrics.snapshot())
+
+
+@app.route('/check-ip-ban', methods=['POST'])
+async def check_ip_ban():
+    ip_address = request.remote_addr
+    channel_id = session.get('channel_id')
+
+    if not ip_address or not channel_id:
+        return jsonify({"error": "Missing data"}), 400
+
+    cfg = await channel_configs.find_one({"channel_id": channel_id})
+    if cfg and ip_address in cfg.get("banned_ips", []):
+        return jsonify({"banned": True}), 200
+
+    return jsonify({"banned": False}), 200
+
+
+@app.route('/banned')
+async def banned():
+    return page(BANNED_PAGE)
+
+
+@app.route('/callback', methods=['POST'])
+async def callback():
+    form = await request.form
+    uid = session.get('uid')
+    ip_address = request.remote_addr
+
+    if session.get('challenge') == 'pow':
+        user_answer = form.get('pow_nonce')
+        correct_answer = session.pop('pow_salt', None)
+        solved = verify_pow(uid, correct_answer, user_answer, session.get('pow_difficulty', config.POW_MAX_DIFFICULTY))
+    else:
+        user_answer = form.get('captcha_answer')
+        correct_answer = session.get('captcha_answer')
+        solved = user_answer == correct_answer
+
+    if not uid or not user_answer or not correct_answer or not ip_address:
+        return page(render_error("Session expired or missing data. Please try again.", 400))
+
+    channel_id = session.get('channel_id')
+    cfg = await channel_configs.find_one({"channel_id": channel_id})
+    if cfg and ip_address in cfg.get("banned_ips", []):
+        return page(render_banned("Your IP address has been banned from accessing this handle.", 403))
+
+    if not solved:
+        # Regenerate CAPTCHA for retry
+        return await render_verify(uid, cfg, error="Incorrect answer. Please try again.", status=400)
+
+    entry = await invite_requests.find_one({"uid": uid})
+    if not entry or entry.get("used"):
+        return page(render_error("This invitation has already been used.", 400))
+
+    try:
+        link = (await invite_pool.atake(entry["channel_id"])
+                or await create_invite_link(entry["channel_id"]))
+
+        await invite_requests.update_one(
+            {"uid": uid},
+            {"$set": {"used": True, "invite_link": link}}
+        )
+
+        try:
+            await notifications.aenqueue(entry["owner_id"],
+                                         "verified",
+                                         requester=entry["requester"],
+                                         profile=entry.get("profile"),
+                                         digest=(cfg or {}).get("notify_digest", False),
+                                         channel_id=entry["channel_id"],
+                                         uid=uid,
+                                         ip_address=ip_address,
+                                         link=link)
+        except Exception as e:
+            LOGGER.error(f"Error sending notification: {e}")
+
+        clear_challenge(session)
+        return redirect(link, code=302)
+    except Exception as e:
+        return page(render_error(f"An error occurred: {str(e)}", 500))
+
+
+async def serve_site():
+    """Serve the ASGI site on the running (bot) event loop until it stops."""
+    hypercorn_config = Config()
+    hypercorn_config.bind = [f"0.0.0.0:{config.WEB_PORT}"]
+    hypercorn_config.keep_alive_timeout = config.WEB_KEEPALIVE
+    hypercorn_config.backlog = config.WEB_BACKLOG
+    hypercorn_config.accesslog = None
+    # Behind the TLS proxy the client address comes from X-Forwarded-For,
+    # as with the Flask site's ProxyFix.
+    site = ProxyFixMiddleware(app, trusted_hops=config.PROXY_HOPS) if config.PROXY_HOPS else app
+    # Signals stay with the bot's idle(); the server runs until the loop ends.
+    await serve(site, hypercorn_config, shutdown_trigger=asyncio.Future)
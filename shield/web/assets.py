@@ -0,0 +1,45 @@
+import hashlib
+import re
+
+from .pages import StaticPage
+
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+ASSET_MIMETYPES = {
+    "css": "text/css",
+    "js": "text/javascript",
+    "woff2": "font/woff2",
+}
+
+INLINE_BLOCK = re.compile(r"<(style|script)>(.*?)</\1>", re.S)
+
+assets = {}
+
+
+def register_asset(name, extension, body):
+    """Store a body under a content-hashed filename and return its URL."""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    filename = f"{name}.{digest}.{extension}"
+    
+    if filename not in assets:
+        assets[filename] = StaticPage(body,
+                                      mimetype=ASSET_MIMETYPES[extension],
+                                      cache_control=ASSET_CACHE_CONTROL)
+    return f"/static/{filename}"
+
+
+def extract_assets(name, source):
+    """Move a template's inline <style> and <script> blocks out into assets.
+
+    Blocks containing Jinja markup stay inline since their output varies per request.
+    """
+    def replace(match):
+        tag, body = match.groups()
+        if "{{" in body or "{%" in body:
+            return match.group(0)
+        if tag == "style":
+            return f'<link rel="stylesheet" href="{register_asset(name, "css", body)}">'
+        return f'<script src="{register_asset(name, "js", body)}"></script>'
+
+    return INLINE_BLOCK.sub(replace, source)
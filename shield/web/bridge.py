@@ -0,0 +1,88 @@
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+from shield import metrics
+
+
+class BridgeBusy(Exception):
+    """Too many calls already in flight to take another before the deadline."""
+
+
+class ClientDisconnected(Exception):
+    """The HTTP client went away, so the call was cancelled."""
+
+
+def client_gone(environ):
+    """Whether the client behind a WSGI request has closed its connection.
+
+    Peeks at the socket that gunicorn or Werkzeug exposes in ``environ``; a
+    server that exposes neither is always treated as still connected.
+    """
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if sock is None:
+        return False
+    try:
+        return sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT) == b""
+    except (BlockingIOError, InterruptedError, ValueError):
+        return False
+    except OSError:
+        return True
+
+
+class LoopBridge:
+    """Runs Pyrogram calls on the bot's event loop on behalf of web worker threads.
+
+    Each call has a deadline (``timeout``) that covers both waiting for one of
+    ``max_inflight`` slots and the call itself. An ``abandon`` callable is
+    polled while waiting and cancels the call once it returns true.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, loop, max_inflight=32, timeout=10.0):
+        self.loop = loop
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_inflight))
+
+    def call(self, method, *args, timeout=None, abandon=None, **kwargs):
+        name = getattr(method, "__name__", "call")
+        deadline = time.monotonic() + (timeout or self.timeout)
+
+        if not self._slots.acquire(timeout=max(0, deadline - time.monotonic())):
+            metrics.incr("bridge.rejected")
+            raise BridgeBusy(f"{name}: no free slot")
+
+        # The method is invoked on the loop itself, where Pyrogram's sync
+        # wrappers hand back the coroutine instead of blocking on it.
+        async def invoke():
+            return await method(*args, **kwargs)
+
+        metrics.adjust("bridge.inflight", 1)
+        started = time.perf_counter()
+        try:
+            future = asyncio.run_coroutine_threadsafe(invoke(), self.loop)
+            while True:
+                try:
+                    result = future.result(timeout=min(self.poll_interval, max(0, deadline - time.monotonic())))
+                    break
+                except TimeoutError:
+                    if abandon is not None and abandon():
+                        future.cancel()
+                        metrics.incr("bridge.cancelled")
+                        raise ClientDisconnected(name)
+                    if time.monotonic() >= deadline:
+                        future.cancel()
+                        metrics.incr("bridge.timeouts")
+                        raise
+                except Exception:
+                    metrics.incr("bridge.errors")
+                    raise
+        finally:
+            metrics.adjust("bridge.inflight", -1)
+            self._slots.release()
+
+        metrics.observe(f"bridge.latency.{name}", time.perf_counter() - started)
+        return result
@@ -0,0 +1,135 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import request as flask_request
+
+import config
+from shield import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "image/svg+xml",
+)
+
+
+def compress(body, coding, level):
+    """Compress ``body`` with ``level`` on a 0-9 scale (brotli is stretched to 0-11)."""
+    if coding == "br":
+        return brotli.compress(body, quality=round(level * 11 / 9))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def negotiate(request=flask_request):
+    """The best coding the client accepts, or None for identity."""
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for coding in CODINGS:
+        quality = accepted[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class CompressedCache:
+    """Bounded LRU of compressed bodies keyed by content hash and coding.
+
+    Bodies that do not shrink are remembered as None so they are not retried.
+    """
+
+    def __init__(self, size=256, level=9):
+        self.size = size
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest, coding, body):
+        key = (digest, coding)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.gauge("compress.cache.hit_ratio", self.hits / (self.hits + self.misses))
+                return self._entries[key]
+            self.misses += 1
+            metrics.gauge("compress.cache.hit_ratio", self.hits / (self.hits + self.misses))
+
+        data = compress(body, coding, self.level)
+        if len(data) >= len(body):
+            data = None
+
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+            metrics.gauge("compress.cache.size", len(self._entries))
+        return data
+
+
+class Compression:
+    """Compresses outgoing Flask responses according to ``Accept-Encoding``.
+
+    Responses that already carry a Content-Encoding (such as StaticPage's
+    cached variants) are left alone; everything else compressible above
+    ``min_size`` bytes is compressed on the fly at ``level``. The ASGI site
+    reuses ``skips`` and ``encode`` from its own after_request hook.
+    """
+
+    def __init__(self, app=None, min_size=1024, level=6):
+        self.min_size = min_size
+        self.level = level
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        if response.direct_passthrough or response.is_streamed or self.skips(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        coding = negotiate()
+        if coding is None:
+            return response
+        return self.encode(response, response.get_data(), coding)
+
+    def skips(self, response):
+        """Whether ``response`` is left as it is whatever the client accepts."""
+        return (response.status_code < 200
+                or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE))
+
+    def encode(self, response, body, coding):
+        """Replace the body of ``response`` (``body``) with its ``coding`` form if that is smaller."""
+        if len(body) < self.min_size:
+            return response
+
+        data = compress(body, coding, self.level)
+        if len(data) >= len(body):
+            return response
+
+        metrics.incr("compress.dynamic")
+        metrics.incr("compress.bytes_in", len(body))
+        metrics.incr("compress.bytes_saved", len(body) - len(data))
+        response.set_data(data)
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{coding}", weak)
+        return response
+
+
+compressed_cache = CompressedCache(config.COMPRESS_CACHE_SIZE)
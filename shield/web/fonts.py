@@ -0,0 +1,41 @@
+import os
+
+from markupsafe import Markup
+
+import config
+
+from .assets import register_asset
+
+FONT_DIR = os.path.join(os.path.dirname(__file__), "static", "fonts")
+
+# (family, file built by scripts/subset_fonts.py, weight, preload). The
+# subsets are committed; Inter is under the SIL OFL (see static/fonts/OFL.txt).
+# Only the body weight is preloaded; the others load when first used.
+FONT_FACES = (
+    ("Inter", "inter-400.woff2", "400", True),
+    ("Inter", "inter-500.woff2", "500", False),
+    ("Inter", "inter-600.woff2", "600", False),
+    ("Inter", "inter-700.woff2", "700 800", False),
+)
+
+
+def font_links():
+    """Preload and @font-face tags for the self-hosted fonts that have been built.
+
+    Missing font files are skipped, leaving the CSS fallback stack in charge.
+    """
+    links, faces = [], []
+    for family, filename, weight, preload in FONT_FACES:
+        path = os.path.join(FONT_DIR, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as font:
+            url = register_asset(os.path.splitext(filename)[0], "woff2", font.read())
+        if preload:
+            links.append(f'<link rel="preload" href="{url}" as="font" type="font/woff2" crossorigin>')
+        faces.append(f"@font-face {{ font-family: '{family}'; src: url({url}) format('woff2'); "
+                     f"font-weight: {weight}; font-style: normal; font-display: {config.FONT_DISPLAY}; }}")
+    
+    if faces:
+        links.append(f'<link rel="stylesheet" href="{register_asset("fonts", "css", chr(10).join(faces))}">')
+    return Markup("\n    ".join(links))
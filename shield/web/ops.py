@@ -0,0 +1,12 @@
+from shield.invites import mint_invite_link
+
+
+async def create_invite_link(channel_id):
+    """A fresh single-use invite link to ``channel_id``, for when the pool is dry."""
+    return await mint_invite_link(channel_id)
+
+
+# Everything the web tier may ask the bot tier to do, by name.
+OPS = {
+    "create_invite_link": create_invite_link,
+}
@@ -0,0 +1,55 @@
+import hashlib
+
+from flask import Response, request as flask_request
+
+from shield import metrics
+
+from .compress import CODINGS, compressed_cache, negotiate
+
+
+class StaticPage:
+    """A response body rendered once and served compressed by ETag.
+
+    Compressed variants come from the shared content-hash cache and are built
+    up front. Each content-coding gets its own strong ETag, and a matching
+    ``If-None-Match`` is answered with an empty 304.
+    """
+
+    def __init__(self, body, status=200, mimetype="text/html", cache_control="public, max-age=86400"):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:20]
+        self.status = status
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+
+        for coding in CODINGS:
+            compressed_cache.get(self.digest, coding, body)
+
+    def variant(self, request):
+        coding = negotiate(request)
+        if coding is not None:
+            data = compressed_cache.get(self.digest, coding, self.body)
+            if data is not None:
+                metrics.incr("compress.bytes_in", len(self.body))
+                metrics.incr("compress.bytes_saved", len(self.body) - len(data))
+                return coding, data, f'"{self.digest}-{coding}"'
+        return None, self.body, f'"{self.digest}"'
+
+    def response(self, request=flask_request, response_class=Response):
+        """Build the response; pass Quart's request and Response to serve it from the ASGI app."""
+        coding, body, etag = self.variant(request)
+
+        if etag in request.headers.get("If-None-Match", ""):
+            response = response_class(b"", status=304)
+        else:
+            response = response_class(body, status=self.status, mimetype=self.mimetype)
+            if coding:
+                response.headers["Content-Encoding"] = coding
+
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = self.cache_control
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
@@ -0,0 +1,163 @@
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import select
+import socket
+import threading
+import time
+
+from shield import metrics
+
+from .bridge import ClientDisconnected
+from .ops import OPS
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RpcError(Exception):
+    """The bot tier ran the operation and it failed."""
+
+
+class RpcUnavailable(Exception):
+    """The bot tier could not be reached."""
+
+
+async def _dispatch(request):
+    name = request.get("op")
+    op = OPS.get(name)
+    if op is None:
+        return {"id": request.get("id"), "error": f"unknown op {name!r}"}
+    
+    started = time.perf_counter()
+    try:
+        result = await op(**request.get("args", {}))
+    except Exception as e:
+        metrics.incr("rpc.server.errors")
+        LOGGER.error(f"RPC {name} failed: {e}")
+        return {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+    metrics.observe(f"rpc.server.{name}", time.perf_counter() - started)
+    return {"id": request.get("id"), "result": result}
+
+
+async def _handle(reader, writer):
+    try:
+        while line := await reader.readline():
+            call = asyncio.ensure_future(_dispatch(json.loads(line)))
+            # Clients send nothing while waiting, so readable means hung up.
+            hangup = asyncio.ensure_future(reader.read(1))
+            await asyncio.wait({call, hangup}, return_when=asyncio.FIRST_COMPLETED)
+            if not call.done():
+                call.cancel()
+                metrics.incr("rpc.server.cancelled")
+                break
+            hangup.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await hangup
+            writer.write(json.dumps(call.result()).encode() + b"\n")
+            await writer.drain()
+    except (ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_rpc(path):
+    """Answer web-tier requests for OPS on a Unix socket at ``path``."""
+    server = await asyncio.start_unix_server(_handle, path=path)
+    LOGGER.info(f"RPC listening on {path}")
+    async with server:
+        await server.serve_forever()
+
+
+class RpcClient:
+    """Calls OPS in the bot process over its Unix socket, one connection per thread.
+
+    Newline-delimited JSON, one request at a time per connection. Timing out
+    or giving up (``abandon``) closes the connection, which cancels the call
+    on the bot side.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, path, timeout=10.0):
+        self.path = path
+        self.timeout = timeout
+        self._ids = itertools.count()
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            metrics.incr("rpc.unavailable")
+            raise RpcUnavailable(f"{self.path}: {e}") from e
+        self._local.conn = (sock, sock.makefile("rb"))
+        return self._local.conn
+
+    def _drop(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[1].close()
+            conn[0].close()
+
+    def _send(self, payload):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn[0].sendall(payload)
+                return conn
+            except OSError:
+                # The bot side restarted since this connection was opened.
+                self._drop()
+        conn = self._connect()
+        conn[0].sendall(payload)
+        return conn
+
+    def call(self, op, timeout=None, abandon=None, **kwargs):
+        deadline = time.monotonic() + (timeout or self.timeout)
+        started = time.perf_counter()
+        payload = json.dumps({"id": next(self._ids), "op": op, "args": kwargs}).encode() + b"\n"
+        
+        try:
+            sock, reader = self._send(payload)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    metrics.incr("rpc.timeouts")
+                    raise TimeoutError(op)
+                if select.select([sock], [], [], min(self.poll_interval, remaining))[0]:
+                    break
+                if abandon is not None and abandon():
+                    metrics.incr("rpc.cancelled")
+                    raise ClientDisconnected(op)
+            sock.settimeout(max(0.01, deadline - time.monotonic()))
+            line = reader.readline()
+        except BaseException:
+            self._drop()
+            raise
+        
+        if not line:
+            self._drop()
+            raise RpcUnavailable(f"{self.path}: connection closed")
+        
+        reply = json.loads(line)
+        if "error" in reply:
+            metrics.incr("rpc.errors")
+            raise RpcError(reply["error"])
+        metrics.observe(f"rpc.latency.{op}", time.perf_counter() - started)
+        return reply["result"]
+
+
+class LocalRpc:
+    """Single-box stand-in for RpcClient: runs OPS on this process's bot loop."""
+
+    def __init__(self, bridge):
+        self.bridge = bridge
+
+    def call(self, op, timeout=None, abandon=None, **kwargs):
+        return self.bridge.call(OPS[op], timeout=timeout, abandon=abandon, **kwargs)